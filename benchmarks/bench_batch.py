@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Throughput of batched decoding (ASREngine.transcribe_many) vs one clip per call
+
+Loads logged clips the same way as bench_replay.py, transcribes them once
+serially through ASREngine.transcribe() and then with transcribe_many() at
+each batch size, and reports clips per second and audio seconds per CPU
+second (throughput per core). Texts that differ from the serial run are
+counted, since batching pads clips to a shared window.
+
+Usage: python benchmarks/bench_batch.py [CSV ...] [--batch-sizes 8 16 32] [--limit N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from bench_replay import DEFAULT_CSVS, SAMPLE_RATE, AudioSource, load_rows
+
+
+def measure(function):
+    """(result, wall seconds, CPU seconds of this process)"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = function()
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs serial transcription throughput")
+    parser.add_argument('csv', nargs='*', help='transcriptions CSVs (default: as bench_replay.py)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--limit', type=int, help='Use at most N clips')
+    args = parser.parse_args()
+
+    from asr import ASREngine
+
+    audio_source = AudioSource()
+    clips = []
+    for csv_path, row in load_rows(args.csv or DEFAULT_CSVS):
+        samples = audio_source.load(csv_path, row.get('audio_file', ''))
+        if samples is not None:
+            clips.append(samples.tobytes())
+    if args.limit:
+        clips = clips[:args.limit]
+    if not clips:
+        print("❌ No clips with audio found")
+        return 1
+    audio_seconds = sum(len(clip) // 2 for clip in clips) / SAMPLE_RATE
+
+    asr = ASREngine.from_env(enable_logging=False)
+    asr.transcribe_many(clips[:2])  # Warm-up
+
+    serial, wall, cpu = measure(lambda: [asr.transcribe(clip)[0] for clip in clips])
+    print(f"\n{len(clips)} clips, {audio_seconds:.1f}s of audio")
+    print(f"{'mode':<12} {'clips/s':>10} {'audio s/CPU s':>14} {'speedup':>8} {'changed':>8}")
+    print(f"{'serial':<12} {len(clips) / wall:>10.2f} {audio_seconds / cpu:>14.2f} {1.0:>8.2f} {0:>8}")
+    for batch_size in args.batch_sizes:
+        texts, batch_wall, batch_cpu = measure(lambda: asr.transcribe_many(clips, batch_size=batch_size))
+        changed = sum(text != reference for text, reference in zip(texts, serial))
+        print(f"{f'batch {batch_size}':<12} {len(clips) / batch_wall:>10.2f} {audio_seconds / batch_cpu:>14.2f} "
+              f"{wall / batch_wall:>8.2f} {changed:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Allocation and copy benchmark for the capture -> ASR handoff, per minute of audio
+
+Compares the previous path (one bytes object per callback chunk, b''.join on
+stop, frombuffer().astype(float32) / 32768 in ASR) with the in-place
+PCMBuffer, zero-copy view and single-pass float32 conversion.
+
+Usage: python benchmarks/bench_capture.py [--minutes N] [--runs N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from audio_buffer import PCMBuffer
+
+SAMPLE_RATE = 16000
+CHUNK = 1024  # AudioCapture's frames_per_buffer
+
+
+def make_chunks(minutes):
+    """Callback payloads: PyAudio hands the callback a fresh bytes object per chunk"""
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-8000, 8000, int(minutes * 60 * SAMPLE_RATE), dtype=np.int16)
+    return [samples[i:i + CHUNK].tobytes() for i in range(0, len(samples), CHUNK)]
+
+
+def legacy_capture(chunks):
+    """The previous frames list + join + double conversion"""
+    frames = []
+    for chunk in chunks:
+        frames.append(chunk)
+    handoff = time.perf_counter()
+    audio_data = b''.join(frames)
+    audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+    return audio_np, time.perf_counter() - handoff
+
+
+def buffered_capture(chunks):
+    """PCMBuffer written in place, handed off as a view, converted once"""
+    buffer = PCMBuffer(initial_seconds=30, sample_rate=SAMPLE_RATE)
+    for chunk in chunks:
+        buffer.write(chunk)
+    handoff = time.perf_counter()
+    audio_data = buffer.view()
+    audio_np = np.multiply(np.frombuffer(audio_data, dtype=np.int16), np.float32(1 / 32768.0), dtype=np.float32)
+    return audio_np, time.perf_counter() - handoff
+
+
+def measure(capture, chunks, runs):
+    """Best-of-runs timings plus tracemalloc peak memory for one run"""
+    totals, handoffs = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _, handoff = capture(chunks)
+        totals.append(time.perf_counter() - start)
+        handoffs.append(handoff)
+    
+    tracemalloc.start()
+    result, _ = capture(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return result, {
+        "total_ms": min(totals) * 1000,
+        "handoff_ms": min(handoffs) * 1000,
+        "peak_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioCapture buffer benchmark")
+    parser.add_argument('--minutes', type=float, default=1.0, help='Minutes of audio per recording')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs (best is reported)')
+    args = parser.parse_args()
+    
+    chunks = make_chunks(args.minutes)
+    legacy_audio, legacy = measure(legacy_capture, chunks, args.runs)
+    buffered_audio, buffered = measure(buffered_capture, chunks, args.runs)
+    assert np.array_equal(legacy_audio, buffered_audio), "conversion mismatch"
+    
+    # Audio-sized allocations kept alive per recording
+    legacy_allocs = len(chunks) + 3  # every chunk's bytes, the join, astype and the division
+    buffer = PCMBuffer(initial_seconds=30, sample_rate=SAMPLE_RATE)
+    for chunk in chunks:
+        buffer.write(chunk)
+    buffered_allocs = buffer.allocations + 1  # buffer growth plus the float32 result
+    
+    print(f"{args.minutes:g} min of audio, {len(chunks)} callback chunks of {CHUNK} frames")
+    print(f"{'':<10} {'capture+handoff':>16} {'handoff only':>13} {'peak MB':>8} {'audio allocs':>13}")
+    for name, stats, allocs in (("legacy", legacy, legacy_allocs), ("buffered", buffered, buffered_allocs)):
+        print(f"{name:<10} {stats['total_ms']:>14.2f}ms {stats['handoff_ms']:>11.2f}ms "
+              f"{stats['peak_mb']:>8.1f} {allocs:>13}")
+
+
+if __name__ == "__main__":
+    main()
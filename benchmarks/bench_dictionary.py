@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for DictionaryCorrector replacements at 10, 1k and 50k entries
+
+Compares the compiled single-pass matcher with the previous approach
+(re-sort + one re.sub per entry on every call).
+
+Usage: python benchmarks/bench_dictionary.py [--calls N]
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from dictionary_corrector import DictionaryCorrector
+
+SIZES = [10, 1_000, 50_000]
+SAMPLE_TEXT = ("okay so I opened the jupiter notebook and pushed the pi file to get hub "
+               "then we talked about Laura fine tuning with wind surf and the gear ignore "
+               "before lunch I think the python code is ready for review")
+
+
+def make_dictionary(size, seed=0):
+    """Synthetic dictionary: real-looking phrases plus random filler phrases"""
+    rng = random.Random(seed)
+    base = json.loads((Path(__file__).parent.parent / "training" / "vocabulary_dictionary.json").read_text())
+    replacements = dict(list(base["replacements"].items())[:size])
+    while len(replacements) < size:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        replacements[" ".join(words)] = "-".join(words).upper()
+    return {**base, "replacements": replacements}
+
+
+def legacy_corrections(dictionary, text):
+    """The pre-compiled-matcher implementation, kept as the baseline"""
+    replacements = sorted(dictionary["replacements"].items(), key=lambda x: len(x[0]), reverse=True)
+    for wrong, correct in replacements:
+        pattern = r'\b' + re.escape(wrong) + r'\b'
+        text = re.sub(pattern, correct, text, flags=re.IGNORECASE)
+    return text
+
+
+def time_per_call(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DictionaryCorrector micro-benchmark")
+    parser.add_argument('--calls', type=int, default=200, help='Calls per measurement')
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'build ms':>10} {'compiled µs/call':>18} {'legacy µs/call':>16} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            dict_file = Path(tmp) / f"dictionary_{size}.json"
+            dict_file.write_text(json.dumps(make_dictionary(size)))
+
+            start = time.perf_counter()
+            corrector = DictionaryCorrector(dict_file)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            compiled = time_per_call(lambda: corrector._replace_phrases(SAMPLE_TEXT), args.calls)
+            # The legacy loop is O(entries) per call - keep the slow runs short
+            legacy_calls = max(1, args.calls * 10 // size)
+            legacy = time_per_call(lambda: legacy_corrections(corrector.dictionary, SAMPLE_TEXT), legacy_calls)
+
+            print(f"{size:>8} {build_ms:>10.1f} {compiled * 1e6:>18.1f} {legacy * 1e6:>16.1f} {legacy / compiled:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Golden-output check and latency benchmark for Punctuator
+
+Verifies add_punctuation against benchmarks/punctuator_golden.json (outputs
+recorded from the original regex implementation), then reports per-call
+latency for 10, 100 and 1,000-word inputs against that original implementation.
+
+Usage: python benchmarks/bench_punctuator.py [--calls N] [--check-only]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from punctuator import Punctuator
+
+GOLDEN_FILE = Path(__file__).parent / "punctuator_golden.json"
+WORD_COUNTS = [10, 100, 1_000]
+VOCABULARY = ("the project is going well and i think we should ship it tomorrow but the "
+              "dashboard still needs work so i will follow up with the team however we can "
+              "review the numbers today i would love to hear your thoughts on the draft").split()
+
+
+def legacy_add_punctuation(punctuator, text):
+    """The original per-call regex implementation, kept as the baseline"""
+    if not text.strip():
+        return text
+    formatted = text.strip().lower()
+    formatted = re.sub(r'\bseparate notes\b', 'separate note', formatted)
+    formatted = re.sub(r'\bwhat you done\b', 'what you did', formatted)
+    for greeting in punctuator.greetings:
+        pattern = r'^(' + re.escape(greeting) + r')\s+([^,])'
+        formatted = re.sub(pattern, r'\1, \2', formatted, flags=re.IGNORECASE)
+    for starter in punctuator.independent_clause_starters:
+        pattern = r'([^,]{15,})\s+(' + re.escape(starter) + r')\s+'
+        formatted = re.sub(pattern, r'\1, \2 ', formatted, flags=re.IGNORECASE)
+    for trigger in ['but', 'so', 'yet', 'however', 'therefore']:
+        pattern = r'([^,]{10,})\s+(' + re.escape(trigger) + r')\s+'
+        formatted = re.sub(pattern, r'\1, \2 ', formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r'\s+(on a separate note)\s+', r'. \1, ', formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r'([^.!?]{30,})\s+(i would love to)\s+', r'\1. \2 ', formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r'^([^,]{25,})\s+(i\s)', r'\1, \2', formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r'\bi\b', 'I', formatted)
+    formatted = re.sub(r'(^|[.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), formatted)
+    if formatted:
+        formatted = formatted[0].upper() + formatted[1:] if len(formatted) > 1 else formatted.upper()
+    if not formatted.endswith(('.', '!', '?')):
+        formatted += '.'
+    formatted = re.sub(r',\s*\.', '.', formatted)
+    formatted = re.sub(r',\s*,', ',', formatted)
+    formatted = re.sub(r'\s+([,.!?])', r'\1', formatted)
+    formatted = re.sub(r'([,.!?])\s+', r'\1 ', formatted)
+    formatted = re.sub(r'\s+', ' ', formatted)
+    return formatted.strip()
+
+
+def check_golden(punctuator):
+    """Return the number of golden cases whose output changed"""
+    cases = json.loads(GOLDEN_FILE.read_text())
+    failures = 0
+    for case in cases:
+        output = punctuator.add_punctuation(case["input"])
+        if output != case["output"]:
+            failures += 1
+            print(f"❌ {case['input']!r}\n   expected {case['output']!r}\n   got      {output!r}")
+    print(f"Golden corpus: {len(cases) - failures}/{len(cases)} cases match")
+    return failures
+
+
+def time_per_call(function, text, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function(text)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Punctuator golden check and benchmark")
+    parser.add_argument('--calls', type=int, default=50, help='Calls per measurement')
+    parser.add_argument('--check-only', action='store_true', help='Only run the golden-output check')
+    args = parser.parse_args()
+
+    punctuator = Punctuator()
+    if check_golden(punctuator):
+        return 1
+    if args.check_only:
+        return 0
+
+    rng = random.Random(0)
+    print(f"\n{'words':>6} {'compiled ms/call':>17} {'legacy ms/call':>15} {'speedup':>9}")
+    for word_count in WORD_COUNTS:
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(word_count))
+        compiled = time_per_call(punctuator.add_punctuation, text, args.calls)
+        legacy = time_per_call(lambda t: legacy_add_punctuation(punctuator, t), text,
+                               max(1, args.calls * 10 // word_count))
+        print(f"{word_count:>6} {compiled * 1000:>17.3f} {legacy * 1000:>15.3f} {legacy / compiled:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
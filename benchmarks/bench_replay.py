@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Headless replay benchmark over logged dictations
+
+Replays the clips listed in transcriptions.csv files through the same chain
+as a real dictation (ASR with VAD and dictionary corrections -> Punctuator ->
+GrammarCorrector) without pynput, PyAudio or the clipboard, and writes a JSON
+report: real-time factor, per-stage latency percentiles, peak RSS and WER
+against corrected_transcription. Reports use sorted keys so two runs can be
+diffed directly, or compared with --baseline.
+
+Audio is looked up as <csv dir>/audio/<audio_file>, then in the sharded
+<csv dir>/audio_archive. Rows without audio (e.g. the example CSV) are
+counted as missing and their logged transcription is replayed through the
+text stages only (dictionary -> Punctuator -> GrammarCorrector), reported
+under "text_only". Export the live database first with
+`python src/data_manager.py export-csv`.
+
+Usage: python benchmarks/bench_replay.py [CSV ...] [--output report.json] [--baseline old.json]
+"""
+
+import argparse
+import csv
+import json
+import platform
+import re
+import resource
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+from timing import tracer, span, PERCENTILES
+
+DEFAULT_CSVS = [ROOT / "training" / "data" / "transcriptions.csv", ROOT / "training" / "example.transcriptions.csv"]
+SAMPLE_RATE = 16000
+COMPARED_METRICS = ("rtf", "wer_asr", "wer_final", "model_load_seconds", "peak_rss_mb")
+
+
+def normalize_words(text):
+    """Lowercase words with punctuation stripped (apostrophes and hyphens kept inside words)"""
+    return re.findall(r"[a-z0-9]+(?:['\-][a-z0-9]+)*", text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance (substitutions + deletions + insertions)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1]
+
+
+def percentiles(values):
+    """Nearest-rank percentiles of unitless values (e.g. per-clip RTF)"""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {f"p{p}": round(ordered[max(1, -(-p * len(ordered) // 100)) - 1], 4) for p in PERCENTILES}
+
+
+def load_rows(csv_paths):
+    """(csv_path, row) for every row of the given CSVs that exist"""
+    rows = []
+    for csv_path in csv_paths:
+        csv_path = Path(csv_path)
+        if not csv_path.exists():
+            print(f"⚠️ Skipping {csv_path}: not found")
+            continue
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            rows.extend((csv_path, row) for row in csv.DictReader(f))
+    return rows
+
+
+class AudioSource:
+    """Find a logged clip as a WAV next to its CSV or in that directory's audio archive"""
+    
+    def __init__(self):
+        self._archives = {}
+    
+    def load(self, csv_path, audio_file):
+        """int16 samples at 16 kHz, or None if the clip is unavailable"""
+        wav_path = csv_path.parent / "audio" / audio_file
+        if wav_path.exists():
+            with wave.open(str(wav_path), 'rb') as wav_file:
+                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2 or wav_file.getframerate() != SAMPLE_RATE:
+                    print(f"⚠️ Skipping {audio_file}: not 16 kHz mono 16-bit")
+                    return None
+                return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        
+        archive = self._archive(csv_path.parent / "audio_archive")
+        if archive is not None and audio_file in archive:
+            samples, sample_rate = archive.read(audio_file)
+            return samples if sample_rate == SAMPLE_RATE else None
+        return None
+    
+    def _archive(self, archive_dir):
+        if archive_dir not in self._archives:
+            self._archives[archive_dir] = None
+            if (archive_dir / "index.db").exists():
+                from audio_archive import AudioArchive
+                self._archives[archive_dir] = AudioArchive(archive_dir)
+        return self._archives[archive_dir]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def replay(args):
+    from asr import ASREngine
+    from punctuator import Punctuator
+    
+    rows = load_rows(args.csv or DEFAULT_CSVS)
+    if args.limit:
+        rows = rows[:args.limit]
+    
+    load_start = time.perf_counter()
+    asr = ASREngine.from_env(enable_logging=False)
+    load_seconds = time.perf_counter() - load_start
+    punctuator = Punctuator()
+    grammar_corrector = None
+    if not args.no_grammar:
+        from grammar_corrector import GrammarCorrector
+        grammar_corrector = GrammarCorrector(enable_correction=True)
+    
+    # Warm-up inference so model initialization does not count against the first clip
+    asr._decode(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    tracer.reset()
+    
+    audio_source = AudioSource()
+    clips, missing, text_rows = [], [], []
+    for csv_path, row in rows:
+        audio_file = row.get('audio_file', '')
+        samples = audio_source.load(csv_path, audio_file)
+        if samples is None:
+            missing.append(audio_file)
+            text_rows.append(row)
+            continue
+        
+        start = time.perf_counter()
+        with span("replay.asr"):
+            raw_text = asr._recognize(asr._bytes_to_numpy(samples))
+            asr_text = asr._apply_dictionary(raw_text)
+        final_text = asr_text
+        if asr_text.strip():
+            with span("replay.punctuate"):
+                final_text = punctuator.add_punctuation(asr_text)
+            if grammar_corrector:
+                with span("replay.grammar"):
+                    final_text = grammar_corrector.correct_grammar(final_text)
+        elapsed = time.perf_counter() - start
+        tracer.record("replay.total", elapsed)
+        
+        reference = normalize_words(row.get('corrected_transcription') or '')
+        audio_seconds = len(samples) / SAMPLE_RATE
+        clips.append({
+            "audio_file": audio_file,
+            "audio_seconds": round(audio_seconds, 3),
+            "processing_seconds": round(elapsed, 4),
+            "rtf": round(elapsed / audio_seconds, 4) if audio_seconds else None,
+            "reference_words": len(reference),
+            "asr_errors": word_errors(reference, normalize_words(asr_text)) if reference else None,
+            "final_errors": word_errors(reference, normalize_words(final_text)) if reference else None,
+            "text": final_text,
+            "policy": asr.last_decoding["policy"] if asr.decoder and asr.last_decoding else None,
+        })
+        print(f"▶️ {audio_file}: {elapsed * 1000:.0f}ms for {audio_seconds:.1f}s -> '{final_text}'")
+    
+    report = build_report(args, asr, clips, missing, load_seconds)
+    report["text_only"] = replay_text(text_rows, asr, punctuator, grammar_corrector)
+    if grammar_corrector:
+        report["grammar"] = {key: value for key, value in grammar_corrector.get_stats().items()
+                             if key == "quantized" or key.startswith("cache_")}
+    return report
+
+
+def replay_text(rows, asr, punctuator, grammar_corrector):
+    """Text stages over logged transcriptions of rows whose audio is unavailable"""
+    tracer.reset()
+    input_errors = final_errors = reference_words = scored = 0
+    for row in rows:
+        text = row.get('transcription', row.get('original_transcription')) or ''
+        reference = normalize_words(row.get('corrected_transcription') or '')
+        if not text.strip() or not reference:
+            continue
+        
+        with span("replay.total"):
+            final_text = asr._apply_dictionary(text)
+            with span("replay.punctuate"):
+                final_text = punctuator.add_punctuation(final_text)
+            if grammar_corrector:
+                with span("replay.grammar"):
+                    final_text = grammar_corrector.correct_grammar(final_text)
+        
+        scored += 1
+        reference_words += len(reference)
+        input_errors += word_errors(reference, normalize_words(text))
+        final_errors += word_errors(reference, normalize_words(final_text))
+    
+    return {
+        "rows": scored,
+        "wer_input": round(input_errors / reference_words, 4) if reference_words else None,
+        "wer_final": round(final_errors / reference_words, 4) if reference_words else None,
+        "stages": tracer.summary(),
+    }
+
+
+def build_report(args, asr, clips, missing, load_seconds):
+    """Aggregate per-clip results into the machine-readable report"""
+    audio_seconds = sum(clip["audio_seconds"] for clip in clips)
+    processing_seconds = sum(clip["processing_seconds"] for clip in clips)
+    scored = [clip for clip in clips if clip["asr_errors"] is not None]
+    reference_words = sum(clip["reference_words"] for clip in scored)
+    
+    def wer(key):
+        return round(sum(clip[key] for clip in scored) / reference_words, 4) if reference_words else None
+    
+    report = {
+        "config": {
+            "backend": asr.backend_name,
+            "model_size": asr.model_size,
+            "cascade_model": asr.cascade.draft.model_size if asr.cascade else None,
+            "compute_type": asr.compute_type if asr.backend_name == "faster-whisper" else None,
+            "vad": asr.vad is not None,
+            "latency_budget": asr.decoder.budget_seconds if asr.decoder else None,
+            "short_utterance_seconds": asr.short_utterance_seconds,
+            "grammar": not args.no_grammar,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "model_load_seconds": round(load_seconds, 3),
+        "clips": len(clips),
+        "missing_audio": len(missing),
+        "audio_seconds": round(audio_seconds, 3),
+        "processing_seconds": round(processing_seconds, 4),
+        "rtf": round(processing_seconds / audio_seconds, 4) if audio_seconds else None,
+        "rtf_per_clip": percentiles([clip["rtf"] for clip in clips if clip["rtf"] is not None]),
+        "wer_asr": wer("asr_errors"),
+        "wer_final": wer("final_errors"),
+        "scored_clips": len(scored),
+        "stages": tracer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if asr.decoder:
+        report["decoding"] = asr.decoder.stats
+    if asr.cascade:
+        report["cascade"] = asr.cascade.get_stats()
+    if asr.short_utterance_seconds:
+        backends = (asr.cascade.draft, asr.cascade.final) if asr.cascade else (asr.backend,)
+        report["short_window"] = {key: sum(backend.stats[key] for backend in backends)
+                                  for key in ("short_window", "full_window")}
+    if args.per_clip:
+        report["per_clip"] = clips
+    return report
+
+
+def print_comparison(report, baseline):
+    """Deltas of the headline metrics and stage p50/p95 against an earlier report"""
+    print(f"\n{'metric':<32} {'baseline':>10} {'current':>10} {'delta':>10}")
+    rows = [(name, baseline.get(name), report.get(name)) for name in COMPARED_METRICS]
+    for stage, stats in report["stages"].items():
+        for key in ("p50_ms", "p95_ms"):
+            rows.append((f"{stage}.{key}", baseline.get("stages", {}).get(stage, {}).get(key), stats.get(key)))
+    for name, old, new in rows:
+        delta = f"{new - old:+.4g}" if old is not None and new is not None else "n/a"
+        print(f"{name:<32} {str(old):>10} {str(new):>10} {delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged dictations through the full post-processing chain")
+    parser.add_argument('csv', nargs='*', help='transcriptions CSVs (default: training/data/transcriptions.csv '
+                                               'and training/example.transcriptions.csv)')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier report to print deltas against')
+    parser.add_argument('--limit', type=int, help='Replay at most N rows')
+    parser.add_argument('--no-grammar', action='store_true', help='Skip Gramformer')
+    parser.add_argument('--per-clip', action='store_true', help='Include per-clip results in the report')
+    args = parser.parse_args()
+    
+    report = replay(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"📊 Report written to {args.output}")
+    else:
+        print(text)
+    
+    print(f"\nClips: {report['clips']} ({report['missing_audio']} missing audio), "
+          f"RTF {report['rtf']}, WER asr {report['wer_asr']} / final {report['wer_final']}, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    text_only = report["text_only"]
+    if text_only["rows"]:
+        print(f"Text-only rows: {text_only['rows']}, WER input {text_only['wer_input']} / final {text_only['wer_final']}")
+    if args.baseline:
+        print_comparison(report, json.loads(Path(args.baseline).read_text()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
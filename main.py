@@ -8,18 +8,23 @@ import sys
 import time
 import os
 import atexit
-import threading
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+# --profile-startup: time imports and model loads, print them and exit
+from startup_profile import StartupProfile
+profile = StartupProfile.from_argv()
+
 from key_listener import KeyListener
 from audio_capture import AudioCapture
-from asr import ASREngine
 from injector import TextInjector
 from advanced_punctuator import AdvancedPunctuator
-from grammar_corrector import GrammarCorrector
+from asr_client import ASRClient, RemoteASREngine, RemoteGrammarCorrector
+from pipeline import DictationPipeline
+from timing import span, tracer, format_summary
 
 # Lock file to prevent multiple instances
 LOCK_FILE = Path("/tmp/heve_ai.lock")
@@ -53,56 +58,102 @@ def cleanup_lock():
     if LOCK_FILE.exists():
         LOCK_FILE.unlink()
 
+def stage(name):
+    """Time a startup step when profiling"""
+    return profile.stage(name) if profile else nullcontext()
+
+def load_models():
+    """Use the warm ASR daemon when HEVE_USE_DAEMON=1, otherwise load models in-process"""
+    if os.environ.get("HEVE_USE_DAEMON", "0") == "1":
+        with stage("ASR daemon connection"):
+            client = ASRClient()
+            available = client.is_available()
+        if available:
+            print(f"⚡ Using warm ASR daemon at {client.socket_path}")
+            return RemoteASREngine(client), RemoteGrammarCorrector(client)
+        print(f"⚠️ ASR daemon not reachable at {client.socket_path}, loading models in-process")
+    
+    # Heavy imports only when the models live in this process
+    with stage("ASR engine"):
+        from asr import ASREngine
+        asr = ASREngine.from_env()
+    with stage("grammar corrector (start)"):
+        from grammar_corrector import GrammarCorrector
+        # Gramformer loads in the background so dictation works right away
+        grammar_corrector = GrammarCorrector(enable_correction=True, background_load=True)
+    return asr, grammar_corrector
+
+def print_startup_profile(grammar_corrector):
+    """Wait for the background Gramformer load, then print the profile"""
+    if isinstance(grammar_corrector, RemoteGrammarCorrector):
+        profile.print_report()
+        return
+    with stage("grammar model (remaining wait)"):
+        grammar_corrector.wait_until_ready()
+    if grammar_corrector.load_time is not None:
+        profile.stages.append(("grammar model (background load)", grammar_corrector.load_time))
+    profile.print_report()
+
 def main():
-    # Check for existing instance
-    if not create_lock():
+    # Check for existing instance (a startup profile can run next to one)
+    if not profile and not create_lock():
         return 1
     
     print("Heve AI - Hold RIGHT OPTION key (⌥) and speak to dictate")
     
     # Initialize components
-    audio = AudioCapture()
-    asr = ASREngine()
-    injector = TextInjector()
-    punctuator = AdvancedPunctuator()
-    grammar_corrector = GrammarCorrector(enable_correction=True)
+    # Always-on mic keeps the stream open and starts each dictation from a pre-roll (HEVE_ALWAYS_ON_MIC=1)
+    always_on = os.environ.get("HEVE_ALWAYS_ON_MIC", "0") == "1"
+    with stage("audio capture"):
+        audio = AudioCapture(always_on=always_on, pre_roll_ms=int(os.environ.get("HEVE_PRE_ROLL_MS", "300")))
+        if always_on:
+            audio.open()
+    if always_on:
+        print(f"🎙️ Always-on microphone with {audio.pre_roll_samples * 1000 // audio.sample_rate}ms pre-roll")
+    with stage("text injector"):
+        injector = TextInjector()
+    with stage("punctuator"):
+        punctuator = AdvancedPunctuator()
+    asr, grammar_corrector = load_models()
+    
+    if profile:
+        print_startup_profile(grammar_corrector)
+        injector.close()
+        audio.close()
+        return 0
+    
+    # Streaming mode decodes while the key is held (HEVE_STREAMING=1)
+    streaming = os.environ.get("HEVE_STREAMING", "0") == "1"
+    if streaming and isinstance(asr, RemoteASREngine):
+        print("⚠️ Streaming needs the in-process model, disabled while using the ASR daemon")
+        streaming = False
+    active_stream = None
+    if streaming:
+        print("🌊 Streaming transcription enabled")
+    
+    # Transcription runs on worker threads; results are injected in recording order
+    pipeline = DictationPipeline(
+        asr, punctuator, grammar_corrector, injector,
+        num_workers=int(os.environ.get("HEVE_PIPELINE_WORKERS", "1"))
+    )
     
     def start_dictation():
+        nonlocal active_stream
         print("Recording...")
-        audio.start()
+        if streaming:
+            active_stream = asr.transcribe_stream()
+            audio.start(on_chunk=active_stream.feed)
+        else:
+            audio.start()
     
     def stop_dictation():
+        nonlocal active_stream
         print("Processing...")
-        audio_data = audio.stop()
-        text, audio_log_data = asr.transcribe(audio_data)
-        if text.strip():
-            # Add advanced punctuation and capitalization
-            formatted_text = punctuator.add_punctuation(text)
-            
-            # Apply grammar correction
-            corrected_text = grammar_corrector.correct_grammar(formatted_text)
-            
-            # 🚀 INJECT TEXT FIRST - HIGHEST PRIORITY
-            injector.type_text(corrected_text)
-            print(f"Typed: {corrected_text}")
-            
-            # Log to CSV in background AFTER injection
-            def log_to_csv():
-                if audio_log_data and asr.logger:
-                    audio_data_for_log, raw_text, sample_rate = audio_log_data
-                    audio_filename = asr.logger.save_transcription(audio_data_for_log, raw_text, sample_rate)
-                    if audio_filename:
-                        asr.logger.update_correction(audio_filename, corrected_text)
-                        if corrected_text != text:
-                            print(f"📝 Grammar correction applied: '{text}' → '{corrected_text}'")
-                        else:
-                            print(f"📝 Final transcription logged: '{corrected_text}'")
-            
-            # Run CSV logging in background AFTER text injection
-            threading.Thread(target=log_to_csv, daemon=True).start()
-            
-        else:
-            print("No speech detected")
+        with span("capture.stop"):
+            audio_data = audio.stop()
+        # Hand off to the pipeline so the key listener returns immediately
+        pipeline.submit(audio_data, stream=active_stream)
+        active_stream = None
     
     # Start key listener for Right Option key
     listener = KeyListener(
@@ -120,7 +171,17 @@ def main():
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
+        cascade = getattr(asr, "cascade", None)
+        if cascade:
+            stats = cascade.get_stats()
+            saved = stats["latency_saved_seconds"]
+            print(f"\n⬆️ Cascade: {stats['escalations']}/{stats['utterances']} escalated "
+                  f"({stats['escalation_rate']:.0%}), latency saved "
+                  + ("n/a" if saved is None else f"{saved:.1f}s"))
+        if tracer.summary():
+            print("\n" + format_summary(tracer.summary()))
         print("\nGoodbye!")
+        injector.close()
         listener.stop()
         return 0
 
@@ -6,6 +6,7 @@
 
 SERVICE_NAME="com.heveai.dictation"
 PLIST_PATH="$HOME/Library/LaunchAgents/$SERVICE_NAME.plist"
+DAEMON_SCRIPT="src/asr_daemon.py"
 
 case "$1" in
     start)
@@ -39,6 +40,16 @@ case "$1" in
         echo "[i] Recent logs:"
         tail -n 20 logs/heve.log 2>/dev/null || echo "No logs found"
         ;;
+    daemon-start)
+        echo "[+] Starting warm ASR daemon..."
+        mkdir -p logs
+        nohup python "$DAEMON_SCRIPT" >> logs/asr_daemon.log 2>&1 &
+        echo "[✓] ASR daemon started (PID: $!) - set HEVE_USE_DAEMON=1 to use it"
+        ;;
+    daemon-stop)
+        echo "[-] Stopping warm ASR daemon..."
+        pkill -f "python.*$DAEMON_SCRIPT" && echo "[✓] ASR daemon stopped" || echo "[X] ASR daemon not running"
+        ;;
     disable)
         echo "[-] Disabling auto-start..."
         launchctl unload "$PLIST_PATH"
@@ -47,7 +58,7 @@ case "$1" in
         ;;
     *)
         echo "Heve AI Service Control"
-        echo "Usage: $0 {start|stop|restart|status|logs|disable}"
+        echo "Usage: $0 {start|stop|restart|status|logs|disable|daemon-start|daemon-stop}"
         echo ""
         echo "Commands:"
         echo "  start   - Start the service"
@@ -56,5 +67,7 @@ case "$1" in
         echo "  status  - Check service status"
         echo "  logs    - Show recent logs"
         echo "  disable - Disable auto-start completely"
+        echo "  daemon-start - Start the warm ASR daemon"
+        echo "  daemon-stop  - Stop the warm ASR daemon"
         ;;
 esac 
\ No newline at end of file
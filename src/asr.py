@@ -1,10 +1,9 @@
 """
-Speech recognition using faster-whisper (OpenAI Whisper)
+Speech recognition using OpenAI Whisper (openai-whisper or faster-whisper backend)
 """
 
-import whisper
+import os
 import numpy as np
-import torch
 from pathlib import Path
 import sys
 
@@ -12,20 +11,72 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent / "training"))
 from data_logger import DataLogger
 from dictionary_corrector import DictionaryCorrector
+from streaming import TranscriptionStream
+from asr_backends import load_backend, CascadeBackend
+from vad import VoiceActivityDetector
+from decoding_policy import BudgetedDecoder
+from timing import span
 
 
 class ASREngine:
-    def __init__(self, model_size="base", enable_logging=True, enable_dictionary=True):
+    def __init__(self, model_size="base", enable_logging=True, enable_dictionary=True,
+                 backend="whisper", compute_type="int8", cpu_threads=0, num_workers=1,
+                 enable_vad=True, vad_options=None, latency_budget=None,
+                 cascade_model=None, cascade_options=None, short_utterance_seconds=0.0):
         """
         Initialize Whisper model
         Model sizes: tiny, base, small, medium, large
         base = good balance of speed/accuracy
+        Backends: whisper (PyTorch float32), whisper-int8 (dynamically quantized,
+        cached on disk), faster-whisper (CTranslate2)
+        compute_type / cpu_threads / num_workers only apply to faster-whisper
+        enable_vad trims silence (vad_options tune VoiceActivityDetector)
+        latency_budget: per-utterance decode budget in seconds - picks beam size,
+        fallback temperatures etc. to fit (see decoding_policy.BudgetedDecoder)
+        cascade_model: smaller draft model (e.g. "tiny") tried before model_size;
+        cascade_options set the escalation thresholds (see CascadeBackend)
+        short_utterance_seconds: openai-whisper backends encode clips up to this
+        long in a 5/10/15/20 s window instead of the padded 30 s one (0 disables)
         """
         try:
-            print(f"Loading Whisper model ({model_size})...")
-            self.model = whisper.load_model(model_size)
+            print(f"Loading Whisper model ({model_size}, {backend})...")
+            self.backend = load_backend(
+                backend,
+                model_size,
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers,
+                short_utterance_seconds=short_utterance_seconds
+            )
+            self.cascade = None
+            if cascade_model:
+                # Both models stay loaded; the draft answers unless it looks unreliable
+                print(f"Loading draft model ({cascade_model}, {backend}) for the cascade...")
+                draft = load_backend(
+                    backend,
+                    cascade_model,
+                    compute_type=compute_type,
+                    cpu_threads=cpu_threads,
+                    num_workers=num_workers,
+                    short_utterance_seconds=short_utterance_seconds
+                )
+                self.backend = self.cascade = CascadeBackend(draft, self.backend, **(cascade_options or {}))
+            self.model_size = model_size
+            self.backend_name = backend
+            self.compute_type = compute_type
+            self.short_utterance_seconds = short_utterance_seconds if backend != "faster-whisper" else 0.0
+            if short_utterance_seconds and backend == "faster-whisper":
+                print("⚠️ The short-utterance window only applies to openai-whisper backends")
             self.sample_rate = 16000
-            print(f"Loaded Whisper model ({model_size})")
+            print(f"Loaded Whisper model ({model_size}, {backend})")
+            
+            # Voice activity detection trims silence before the model sees it
+            self.vad = VoiceActivityDetector(self.sample_rate, **(vad_options or {})) if enable_vad else None
+            self.last_vad = None
+            
+            # Decoding policy chosen per utterance to fit the latency budget
+            self.decoder = BudgetedDecoder(latency_budget) if latency_budget else None
+            self.last_decoding = None
             
             # Initialize data logger
             self.logger = DataLogger() if enable_logging else None
@@ -36,11 +87,50 @@ class ASREngine:
             self.dictionary = DictionaryCorrector() if enable_dictionary else None
             if self.dictionary:
                 print("📚 Dictionary correction enabled - real-time vocabulary fixes")
+            
+            # Likely dictionary terms are worth the larger model
+            if self.cascade and self.dictionary:
+                self.cascade.term_detector = self.dictionary.contains_term
                 
         except Exception as e:
             print(f"Could not load Whisper model: {e}")
             raise
     
+    @classmethod
+    def from_env(cls, **kwargs):
+        """
+        Create an engine configured from HEVE_* environment variables so each
+        deployment can pick its backend without code changes:
+        HEVE_ASR_BACKEND, HEVE_MODEL_SIZE, HEVE_COMPUTE_TYPE, HEVE_CPU_THREADS, HEVE_NUM_WORKERS, HEVE_VAD,
+        HEVE_LATENCY_BUDGET_MS, HEVE_SHORT_UTTERANCE_SECONDS, HEVE_CASCADE_MODEL, the
+        cascade thresholds HEVE_CASCADE_LOGPROB, HEVE_CASCADE_NO_SPEECH, HEVE_CASCADE_COMPRESSION
+        and HEVE_CASCADE_TERMS (0 stops dictionary terms from escalating)
+        """
+        budget_ms = int(os.environ.get("HEVE_LATENCY_BUDGET_MS", "0"))
+        thresholds = {
+            "logprob_threshold": "HEVE_CASCADE_LOGPROB",
+            "no_speech_threshold": "HEVE_CASCADE_NO_SPEECH",
+            "compression_ratio_threshold": "HEVE_CASCADE_COMPRESSION",
+        }
+        cascade_options = {name: float(os.environ[variable])
+                           for name, variable in thresholds.items() if variable in os.environ}
+        if "HEVE_CASCADE_TERMS" in os.environ:
+            cascade_options["escalate_on_terms"] = os.environ["HEVE_CASCADE_TERMS"] == "1"
+        options = {
+            "backend": os.environ.get("HEVE_ASR_BACKEND", "whisper"),
+            "model_size": os.environ.get("HEVE_MODEL_SIZE", "base"),
+            "compute_type": os.environ.get("HEVE_COMPUTE_TYPE", "int8"),
+            "cpu_threads": int(os.environ.get("HEVE_CPU_THREADS", "0")),
+            "num_workers": int(os.environ.get("HEVE_NUM_WORKERS", "1")),
+            "enable_vad": os.environ.get("HEVE_VAD", "1") == "1",
+            "latency_budget": budget_ms / 1000 if budget_ms else None,
+            "short_utterance_seconds": float(os.environ.get("HEVE_SHORT_UTTERANCE_SECONDS", "0")),
+            "cascade_model": os.environ.get("HEVE_CASCADE_MODEL") or None,
+            "cascade_options": cascade_options,
+        }
+        options.update(kwargs)
+        return cls(**options)
+    
     def transcribe(self, audio_data):
         """Convert audio data to text using Whisper"""
         if not audio_data:
@@ -50,20 +140,11 @@ class ASREngine:
             # Convert audio bytes to numpy array
             audio_np = self._bytes_to_numpy(audio_data)
             
-            # Transcribe with Whisper
-            result = self.model.transcribe(audio_np, language="en")
-            raw_text = result["text"].strip()
+            # Trim silence and transcribe with Whisper
+            raw_text = self._recognize(audio_np)
             
             # Apply real-time dictionary corrections
-            corrected_text = raw_text
-            if self.dictionary:
-                corrected_text = self.dictionary.apply_real_time_corrections(raw_text)
-                
-                # If corrections were made, suggest adding to dictionary
-                if corrected_text != raw_text:
-                    suggestions = self.dictionary.suggest_corrections(raw_text, corrected_text)
-                    for wrong, correct in suggestions:
-                        print(f"💡 Dictionary suggestion: '{wrong}' → '{correct}'")
+            corrected_text = self._apply_dictionary(raw_text)
             
             # Return text and audio data for logging after injection
             return corrected_text, (audio_data, raw_text, self.sample_rate) if self.logger else None
@@ -72,12 +153,116 @@ class ASREngine:
             print(f"❌ Transcription error: {e}")
             return "", None
     
+    def transcribe_many(self, clips, batch_size=16):
+        """
+        Transcribe many clips (16-bit PCM, like transcribe()) and return the
+        dictionary-corrected texts in input order. Clips are VAD-trimmed, sorted
+        by length and decoded in batches of batch_size on backends with
+        transcribe_batch(); the others decode one clip at a time. The latency
+        budget does not apply and nothing is logged
+        """
+        texts = [""] * len(clips)
+        audios = []
+        for index, clip in enumerate(clips):
+            audio_np = self._bytes_to_numpy(clip)
+            if self.vad:
+                with span("asr.vad"):
+                    audio_np, vad = self.vad.trim(audio_np)
+                if not vad["speech"]:
+                    continue
+            if len(audio_np):
+                audios.append((index, audio_np))
+        
+        # Similar lengths share an encoder window and finish decoding together
+        audios.sort(key=lambda item: len(item[1]))
+        transcribe_batch = getattr(self.backend, "transcribe_batch", None)
+        for start in range(0, len(audios), batch_size):
+            group = audios[start:start + batch_size]
+            batch_audio = [audio_np for _, audio_np in group]
+            with span("asr.decode", clips=len(group),
+                      audio_seconds=round(sum(map(len, batch_audio)) / self.sample_rate, 2)):
+                if transcribe_batch:
+                    results = transcribe_batch(batch_audio)
+                else:
+                    results = [self.backend.transcribe(audio_np) for audio_np in batch_audio]
+            for (index, _), result in zip(group, results):
+                texts[index] = self._apply_dictionary(result["text"].strip())
+        return texts
+    
+    def transcribe_stream(self, **kwargs):
+        """
+        Start a streaming transcription while audio is still being recorded.
+        Feed chunks with stream.feed() (e.g. as the AudioCapture chunk callback)
+        and call stream.finish() on key release to get (text, audio_log_data).
+        Partial windows and the final tail go through the same VAD and decoding
+        policy as transcribe()
+        """
+        return TranscriptionStream(self, sample_rate=self.sample_rate, **kwargs).start()
+    
+    def _recognize(self, audio_np):
+        """Trim silence, then decode; silence-only clips skip the model entirely"""
+        return self._recognize_result(audio_np, verbose=True)["text"].strip()
+    
+    def _recognize_result(self, audio_np, verbose=False, **options):
+        """
+        Full backend result for _recognize (VAD, then the latency budget's policy);
+        segment timestamps are relative to the untrimmed audio_np
+        """
+        self.last_decoding = None
+        offset = 0
+        if self.vad:
+            with span("asr.vad"):
+                audio_np, self.last_vad = self.vad.trim(audio_np)
+            if not self.last_vad["speech"]:
+                if verbose:
+                    print("🔇 Silence only - skipped Whisper")
+                return {"text": "", "segments": []}
+            offset = self.last_vad["start"]
+            if verbose and self.last_vad["trimmed_samples"]:
+                print(f"✂️ VAD trimmed {self.last_vad['trimmed_samples'] / self.sample_rate * 1000:.0f}ms of silence")
+        
+        if self.decoder:
+            result, self.last_decoding = self.decoder.decode(
+                lambda audio, **policy_options: self._decode(audio, **options, **policy_options),
+                audio_np, self.sample_rate)
+            if verbose:
+                print(f"🎯 Decoding policy '{self.last_decoding['policy']}': "
+                      f"{len(self.last_decoding['attempts'])} attempt(s) in {self.last_decoding['elapsed_seconds'] * 1000:.0f}ms"
+                      + (" - budget exhausted, using best so far" if self.last_decoding["budget_exhausted"] else ""))
+        else:
+            result = self._decode(audio_np, **options)
+        
+        if offset:
+            shift = offset / self.sample_rate
+            result = dict(result, segments=[dict(segment, start=segment["start"] + shift, end=segment["end"] + shift)
+                                            for segment in result.get("segments", [])])
+        return result
+    
+    def _decode(self, audio_np, **options):
+        """Run the backend on float32 audio (backends serialize concurrent calls)"""
+        with span("asr.decode", audio_seconds=round(len(audio_np) / self.sample_rate, 2)):
+            return self.backend.transcribe(audio_np, **options)
+    
+    def _apply_dictionary(self, raw_text):
+        """Apply real-time dictionary corrections to raw model output"""
+        if not self.dictionary:
+            return raw_text
+        
+        with span("asr.dictionary"):
+            corrected_text = self.dictionary.apply_real_time_corrections(raw_text)
+        
+        # If corrections were made, suggest adding to dictionary
+        if corrected_text != raw_text:
+            suggestions = self.dictionary.suggest_corrections(raw_text, corrected_text)
+            for wrong, correct in suggestions:
+                print(f"💡 Dictionary suggestion: '{wrong}' → '{correct}'")
+        
+        return corrected_text
+    
     def _bytes_to_numpy(self, audio_data):
         """Convert audio bytes to numpy array for Whisper"""
-        # Convert bytes to numpy array
+        # View the bytes as int16 without copying
         audio_np = np.frombuffer(audio_data, dtype=np.int16)
         
-        # Convert to float32 and normalize to [-1, 1]
-        audio_np = audio_np.astype(np.float32) / 32768.0
-        
-        return audio_np 
\ No newline at end of file
+        # Convert to float32 and normalize to [-1, 1] in a single pass (one allocation)
+        return np.multiply(audio_np, np.float32(1 / 32768.0), dtype=np.float32) 
\ No newline at end of file
@@ -0,0 +1,387 @@
+"""
+Pluggable Whisper inference backends for ASREngine
+
+Every backend returns results shaped like openai-whisper's transcribe():
+{"text": str, "segments": [{"start", "end", "text", "avg_logprob",
+"no_speech_prob", "compression_ratio"}, ...]}
+"""
+
+import os
+import threading
+import time
+import types
+import warnings
+from pathlib import Path
+
+from timing import record, span
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30.0
+
+# Encoder windows (seconds) for the short-utterance path; a clip uses the smallest that fits
+SHORT_WINDOW_BUCKETS = (5.0, 10.0, 15.0, 20.0)
+
+# transcribe() defaults, reproduced by the short-utterance path
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+class WhisperBackend:
+    """openai-whisper (PyTorch, float32 on CPU)"""
+    name = "whisper"
+
+    def __init__(self, model_size="base", short_utterance_seconds=0.0):
+        """
+        short_utterance_seconds: clips up to this long are encoded in a window
+        rounded up to SHORT_WINDOW_BUCKETS instead of the padded 30 s (0 disables)
+        """
+        import whisper
+        self.model_size = model_size
+        self.model = whisper.load_model(model_size)
+        self.lock = threading.Lock()  # One decode at a time on the PyTorch model
+        self._prepare_decoding(short_utterance_seconds)
+
+    def transcribe(self, audio_np, **options):
+        with self.lock:
+            window = self._short_window(len(audio_np))
+            self.stats["short_window" if window else "full_window"] += 1
+            if window:
+                with span("asr.short_window", window_seconds=window):
+                    return self._transcribe_windows([audio_np], window, **options)[0]
+            return self.model.transcribe(audio_np, language="en", **options)
+
+    def transcribe_batch(self, audios, **options):
+        """
+        transcribe() for several clips with one batched encoder and decoder pass.
+        Clips up to 30 s share a window (the short-utterance bucket of the longest
+        one, else 30 s), so similar lengths batch best; longer clips are
+        transcribed one at a time
+        """
+        results = [None] * len(audios)
+        for index, audio_np in enumerate(audios):
+            if len(audio_np) > WINDOW_SECONDS * SAMPLE_RATE:
+                results[index] = self.transcribe(audio_np, **options)
+        batch = [index for index, result in enumerate(results) if result is None]
+        if not batch:
+            return results
+
+        with self.lock:
+            window = self._short_window(max(len(audios[index]) for index in batch))
+            self.stats["short_window" if window else "full_window"] += len(batch)
+            window = window or WINDOW_SECONDS
+            with span("asr.batch", clips=len(batch), window_seconds=window):
+                transcripts = self._transcribe_windows([audios[index] for index in batch], window, **options)
+        for index, transcript in zip(batch, transcripts):
+            results[index] = transcript
+        return results
+
+    def _prepare_decoding(self, short_utterance_seconds):
+        """Tokenizer for the window-level decoding paths; variable-length encoder if needed"""
+        from whisper.tokenizer import get_tokenizer
+        self.short_utterance_seconds = short_utterance_seconds
+        self.stats = {"short_window": 0, "full_window": 0}
+        self.tokenizer = get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                       language="en", task="transcribe")
+        if short_utterance_seconds:
+            # The stock encoder asserts a full 30 s input; this one accepts shorter windows
+            encoder = self.model.encoder
+            encoder.forward = types.MethodType(_variable_window_forward, encoder)
+
+    def _short_window(self, num_samples):
+        """Encoder window in seconds for a clip, or None to use the standard 30 s path"""
+        if self.short_utterance_seconds and num_samples <= self.short_utterance_seconds * SAMPLE_RATE:
+            return next((bucket for bucket in SHORT_WINDOW_BUCKETS if bucket * SAMPLE_RATE >= num_samples), None)
+        return None
+
+    def _transcribe_windows(self, audios, window, temperature=TEMPERATURES, beam_size=None, best_of=None,
+                            initial_prompt=None, compression_ratio_threshold=COMPRESSION_RATIO_THRESHOLD,
+                            logprob_threshold=LOGPROB_THRESHOLD, no_speech_threshold=NO_SPEECH_THRESHOLD,
+                            **_):
+        """
+        transcribe() for clips that fit in one `window`-second encoder window:
+        mels are padded to the window and decoded as one batch, with the same
+        temperature fallback (re-decoding only the clips that failed) and
+        silence checks
+        """
+        import torch
+        import whisper
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(audio_np, self.model.dims.n_mels,
+                                        padding=int(window * SAMPLE_RATE) - len(audio_np))
+            for audio_np in audios
+        ])
+
+        def silence(result):
+            return result.no_speech_prob > no_speech_threshold and result.avg_logprob < logprob_threshold
+
+        results = [None] * len(audios)
+        remaining = list(range(len(audios)))
+        temperatures = temperature if isinstance(temperature, (list, tuple)) else (temperature,)
+        for current in temperatures:
+            options = {"language": "en", "task": "transcribe", "temperature": current,
+                       "prompt": initial_prompt, "fp16": False}
+            if current > 0:
+                options["best_of"] = best_of  # Sampling; beam search only applies at temperature 0
+            else:
+                options["beam_size"] = beam_size
+            decoded = whisper.decode(self.model, mel[remaining], whisper.DecodingOptions(**options))
+
+            failed = []
+            for index, result in zip(remaining, decoded):
+                results[index] = result
+                if not silence(result) and (result.compression_ratio > compression_ratio_threshold
+                                            or result.avg_logprob < logprob_threshold):
+                    failed.append(index)
+            remaining = failed
+            if not remaining:
+                break
+
+        return [{"text": "", "segments": []} if silence(result) else self._transcript(result, len(audio_np))
+                for audio_np, result in zip(audios, results)]
+
+    def _transcript(self, result, num_samples):
+        """transcribe()-shaped result for one decoded window"""
+        duration = num_samples / SAMPLE_RATE
+        segments = [
+            {
+                "start": start,
+                "end": min(end, duration),
+                "text": self.tokenizer.decode(tokens),
+                "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob,
+                "compression_ratio": result.compression_ratio,
+                "temperature": result.temperature,
+            }
+            for start, end, tokens in _split_timestamps(result.tokens, self.tokenizer.timestamp_begin, duration)
+        ]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """
+    openai-whisper with int8 dynamically quantized linear layers. The quantized
+    model is pickled to cache_dir (keyed by model size and library versions)
+    and loaded from there on later starts, skipping the float32 checkpoint
+    """
+    name = "whisper-int8"
+
+    def __init__(self, model_size="base", short_utterance_seconds=0.0, cache_dir=None):
+        import torch
+        import whisper
+        self.model_size = model_size
+        cache_dir = Path(cache_dir or Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "heveai")
+        self.cache_path = cache_dir / (f"whisper-{model_size}-int8-openai-whisper{whisper.__version__}-"
+                                       f"torch{torch.__version__}-{torch.backends.quantized.engine}.pt")
+
+        start = time.perf_counter()
+        if self.cache_path.exists():
+            # Our own file - a pickled module, so weights_only loading cannot read it
+            self.model = torch.load(self.cache_path, weights_only=False)
+            print(f"⚡ Loaded quantized model from {self.cache_path}")
+        else:
+            self.model = self._quantize(whisper.load_model(model_size, device="cpu"))
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            temporary_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            torch.save(self.model, temporary_path)
+            os.replace(temporary_path, self.cache_path)
+            print(f"💾 Cached quantized model at {self.cache_path}")
+        record("asr.model_load", time.perf_counter() - start)
+        self.lock = threading.Lock()
+        self._prepare_decoding(short_utterance_seconds)
+
+    @staticmethod
+    def _quantize(model):
+        """Replace the encoder and decoder nn.Linear layers with dynamic int8 ones"""
+        import torch
+        from whisper.model import Linear
+        # quantize_dynamic only swaps exact nn.Linear instances; whisper's subclass
+        # just casts weights to the input dtype, a no-op for float32 on CPU
+        for module in model.modules():
+            if type(module) is Linear:
+                module.__class__ = torch.nn.Linear
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class FasterWhisperBackend:
+    """faster-whisper (CTranslate2) with configurable quantization"""
+    name = "faster-whisper"
+    COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+
+    # openai-whisper option names that faster-whisper spells differently
+    OPTION_NAMES = {"logprob_threshold": "log_prob_threshold"}
+
+    def __init__(self, model_size="base", compute_type="int8", cpu_threads=0, num_workers=1):
+        if compute_type not in self.COMPUTE_TYPES:
+            raise ValueError(f"Unsupported compute type '{compute_type}' "
+                             f"(choose from {', '.join(self.COMPUTE_TYPES)})")
+
+        from faster_whisper import WhisperModel
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.model = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers
+        )
+        # CTranslate2 runs up to num_workers decodes in parallel
+        self.lock = threading.BoundedSemaphore(max(1, num_workers))
+
+    def transcribe(self, audio_np, **options):
+        options = {self.OPTION_NAMES.get(key, key): value for key, value in options.items()
+                   if key != "fp16"}
+        with self.lock:
+            segments, _ = self.model.transcribe(audio_np, language="en", **options)
+            # Segments are a lazy generator - decoding happens while iterating
+            segments = [
+                {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "avg_logprob": segment.avg_logprob,
+                    "no_speech_prob": segment.no_speech_prob,
+                    "compression_ratio": segment.compression_ratio,
+                }
+                for segment in segments
+            ]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+
+class CascadeBackend:
+    """
+    Decode with a small draft model first and escalate to the larger model
+    only when the draft looks unreliable. Both models stay loaded.
+    """
+    name = "cascade"
+
+    def __init__(self, draft, final, logprob_threshold=-0.6, no_speech_threshold=0.5,
+                 compression_ratio_threshold=2.2, term_detector=None, escalate_on_terms=True):
+        """
+        A draft is escalated if any segment has avg_logprob below
+        logprob_threshold, no_speech_prob above no_speech_threshold or
+        compression_ratio above compression_ratio_threshold, or if
+        term_detector(text) reports a likely dictionary term (unless
+        escalate_on_terms is False)
+        """
+        self.draft = draft
+        self.final = final
+        self.model_size = f"{draft.model_size}->{final.model_size}"
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.term_detector = term_detector
+        self.escalate_on_terms = escalate_on_terms
+
+        self._lock = threading.Lock()
+        self.stats = {"utterances": 0, "escalations": 0, "reasons": {},
+                      "draft_seconds": 0.0, "final_seconds": 0.0, "audio_seconds": 0.0,
+                      "escalated_audio_seconds": 0.0}
+
+    def transcribe(self, audio_np, **options):
+        audio_seconds = len(audio_np) / SAMPLE_RATE
+        start = time.perf_counter()
+        result = self.draft.transcribe(audio_np, **options)
+        draft_time = time.perf_counter() - start
+        record("asr.cascade_draft", draft_time)
+
+        reason = self.escalation_reason(result)
+        final_time = 0.0
+        if reason:
+            start = time.perf_counter()
+            result = self.final.transcribe(audio_np, **options)
+            final_time = time.perf_counter() - start
+            record("asr.cascade_final", final_time)
+            print(f"⬆️ Escalated to {self.final.model_size} ({reason})")
+
+        with self._lock:
+            self.stats["utterances"] += 1
+            self.stats["draft_seconds"] += draft_time
+            self.stats["audio_seconds"] += audio_seconds
+            if reason:
+                self.stats["escalations"] += 1
+                self.stats["reasons"][reason] = self.stats["reasons"].get(reason, 0) + 1
+                self.stats["final_seconds"] += final_time
+                self.stats["escalated_audio_seconds"] += audio_seconds
+        return result
+
+    def escalation_reason(self, result):
+        """Why the draft result should be re-decoded by the final model, or None"""
+        for segment in result.get("segments", []):
+            if segment.get("avg_logprob", 0.0) < self.logprob_threshold:
+                return "avg_logprob"
+            if segment.get("no_speech_prob", 0.0) > self.no_speech_threshold:
+                return "no_speech_prob"
+            if segment.get("compression_ratio", 0.0) > self.compression_ratio_threshold:
+                return "compression_ratio"
+        if self.escalate_on_terms and self.term_detector and self.term_detector(result.get("text", "")):
+            return "dictionary_term"
+        return None
+
+    def get_stats(self) -> dict:
+        """
+        Escalation rate and estimated latency saved. The final model's cost on
+        non-escalated clips is extrapolated from its speed on escalated ones;
+        escalations pay the draft decode on top, which counts against the savings.
+        """
+        with self._lock:
+            stats = dict(self.stats, reasons=dict(self.stats["reasons"]))
+        stats["escalation_rate"] = stats["escalations"] / stats["utterances"] if stats["utterances"] else 0.0
+        stats["latency_saved_seconds"] = None
+        if stats["escalated_audio_seconds"]:
+            final_rtf = stats["final_seconds"] / stats["escalated_audio_seconds"]
+            # Time the final model alone would have needed, minus what the cascade spent
+            final_only = final_rtf * stats["audio_seconds"]
+            stats["latency_saved_seconds"] = final_only - stats["draft_seconds"] - stats["final_seconds"]
+        return stats
+
+
+def _variable_window_forward(self, x):
+    """AudioEncoder.forward for mel windows of up to 30 s (positional embedding cut to fit)"""
+    import torch.nn.functional as F
+    x = F.gelu(self.conv1(x))
+    x = F.gelu(self.conv2(x))
+    x = x.permute(0, 2, 1)
+    x = (x + self.positional_embedding[:x.shape[1]]).to(x.dtype)
+    for block in self.blocks:
+        x = block(x)
+    return self.ln_post(x)
+
+
+def _split_timestamps(tokens, timestamp_begin, duration):
+    """(start, end, text tokens) per segment of a decoded token sequence with timestamp tokens"""
+    segments = []
+    start, text_tokens = 0.0, []
+    for token in tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        time_offset = (token - timestamp_begin) * 0.02
+        if text_tokens:
+            segments.append((start, time_offset, text_tokens))
+            text_tokens = []
+        start = time_offset
+    if text_tokens:
+        segments.append((start, duration, text_tokens))
+    return segments
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    QuantizedWhisperBackend.name: QuantizedWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_backend(name, model_size="base", **options):
+    """Create a backend by name, passing backend-specific options through"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}' (choose from {', '.join(BACKENDS)})")
+    short_utterance_seconds = options.pop("short_utterance_seconds", 0.0)
+    if name in (WhisperBackend.name, QuantizedWhisperBackend.name):
+        return BACKENDS[name](model_size, short_utterance_seconds=short_utterance_seconds)
+    return BACKENDS[name](model_size, **options)
@@ -0,0 +1,164 @@
+"""
+Thin client for the warm ASR daemon (see asr_daemon.py)
+
+Wire format (all integers big-endian):
+    request:  op (1 byte) | payload length (4 bytes) | payload
+    response: status (1 byte) | payload length (4 bytes) | JSON payload
+
+TRANSCRIBE payloads are the sample rate (4 bytes) followed by raw 16-bit mono
+PCM, so audio is sent without any encoding overhead. CORRECT payloads are UTF-8 text.
+"""
+
+import json
+import os
+import socket
+import struct
+import threading
+
+DEFAULT_SOCKET_PATH = os.environ.get("HEVE_DAEMON_SOCKET", "/tmp/heve_ai_asr.sock")
+
+HEADER = struct.Struct("!BI")
+SAMPLE_RATE = struct.Struct("!I")
+
+OP_PING = 1
+OP_TRANSCRIBE = 2
+OP_CORRECT = 3
+OP_STATS = 4
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class DaemonError(Exception):
+    """Raised when the daemon is unreachable or reports an error"""
+
+
+def read_exact(sock, size):
+    """Read exactly size bytes from a socket"""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def read_frame(sock):
+    """Read one (code, payload) frame"""
+    code, length = HEADER.unpack(read_exact(sock, HEADER.size))
+    return code, read_exact(sock, length)
+
+
+def write_frame(sock, code, payload=b""):
+    """Write one (code, payload) frame"""
+    sock.sendall(HEADER.pack(code, len(payload)) + payload)
+
+
+class ASRClient:
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()  # One request in flight per connection
+
+    def is_available(self) -> bool:
+        """Check whether a daemon is listening"""
+        try:
+            self.request(OP_PING)
+            return True
+        except DaemonError:
+            return False
+
+    def transcribe(self, audio_data, sample_rate=16000) -> dict:
+        """Transcribe raw 16-bit PCM; returns {"text", "raw_text"}"""
+        return self.request(OP_TRANSCRIBE, SAMPLE_RATE.pack(sample_rate) + bytes(audio_data))
+
+    def correct(self, text) -> dict:
+        """Grammar-correct text; returns {"text"}"""
+        return self.request(OP_CORRECT, text.encode("utf-8"))
+
+    def stats(self) -> dict:
+        """The daemon's per-stage latency summary (see timing.Tracer.summary)"""
+        return self.request(OP_STATS)
+
+    def request(self, op, payload=b"") -> dict:
+        """
+        Send one request over a persistent connection, reconnecting once if it
+        dropped. Timeouts are not retried - the daemon may still be working on it
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    write_frame(self._sock, op, payload)
+                    status, body = read_frame(self._sock)
+                    break
+                except (ConnectionError, FileNotFoundError) as e:
+                    self.close()
+                    if attempt:
+                        raise DaemonError(f"ASR daemon unavailable at {self.socket_path}: {e}")
+                except OSError as e:
+                    # A late response would be read as the answer to the next request
+                    self.close()
+                    raise DaemonError(f"ASR daemon request failed at {self.socket_path}: {e}")
+
+        response = json.loads(body.decode("utf-8"))
+        if status != STATUS_OK:
+            raise DaemonError(response.get("error", "unknown daemon error"))
+        return response
+
+    def close(self):
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+
+
+class RemoteASREngine:
+    """Drop-in replacement for ASREngine that transcribes through the daemon"""
+
+    def __init__(self, client=None, enable_logging=True):
+        from data_logger import DataLogger
+
+        self.client = client or ASRClient()
+        self.sample_rate = 16000
+        self.logger = DataLogger() if enable_logging else None
+
+    def transcribe(self, audio_data):
+        """Convert audio data to text using the daemon's warm model"""
+        if not audio_data:
+            return "", None
+
+        try:
+            result = self.client.transcribe(audio_data, self.sample_rate)
+            return result["text"], (audio_data, result["raw_text"], self.sample_rate) if self.logger else None
+        except DaemonError as e:
+            print(f"❌ Transcription error: {e}")
+            return "", None
+
+
+class RemoteGrammarCorrector:
+    """Drop-in replacement for GrammarCorrector that corrects through the daemon"""
+
+    def __init__(self, client=None):
+        self.client = client or ASRClient()
+
+    def correct_grammar(self, text: str) -> str:
+        if not text.strip():
+            return text
+        try:
+            return self.client.correct(text)["text"]
+        except DaemonError as e:
+            print(f"❌ Grammar correction failed: {e}")
+            return text
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Warm ASR daemon - loads Whisper and Gramformer once and serves
+transcribe/correct requests over a local Unix socket (see asr_client.py)
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from asr_client import (
+    DEFAULT_SOCKET_PATH, SAMPLE_RATE, OP_PING, OP_TRANSCRIBE, OP_CORRECT, OP_STATS,
+    STATUS_OK, STATUS_ERROR, read_frame, write_frame
+)
+from timing import span, tracer
+
+
+class ASRDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, asr, grammar_corrector=None):
+        self.asr = asr
+        self.grammar_corrector = grammar_corrector
+        self.requests_served = 0
+        self._stats_lock = threading.Lock()  # Handlers run on one thread per connection
+        super().__init__(socket_path, DaemonRequestHandler)
+
+    def warm_up(self):
+        """Run one throwaway inference so the first real request is fast"""
+        import numpy as np
+
+        start_time = time.time()
+        self.asr._decode(np.zeros(self.asr.sample_rate, dtype=np.float32))
+        if self.grammar_corrector:
+            self.grammar_corrector.correct_grammar("this are a warm up sentence")
+        print(f"🔥 Warm-up finished in {time.time() - start_time:.2f}s")
+
+    def handle_op(self, op, payload) -> dict:
+        """Dispatch one decoded request"""
+        if op == OP_PING:
+            with self._stats_lock:
+                return {"ok": True, "requests_served": self.requests_served}
+
+        if op == OP_TRANSCRIBE:
+            (sample_rate,) = SAMPLE_RATE.unpack_from(payload)
+            if sample_rate != self.asr.sample_rate:
+                raise ValueError(f"Expected {self.asr.sample_rate} Hz audio, got {sample_rate} Hz")
+            audio_np = self.asr._bytes_to_numpy(payload[SAMPLE_RATE.size:])
+            if not len(audio_np):
+                return {"text": "", "raw_text": ""}
+            with span("daemon.transcribe"):
+                raw_text = self.asr._recognize(audio_np)
+            return {"text": self.asr._apply_dictionary(raw_text), "raw_text": raw_text}
+
+        if op == OP_CORRECT:
+            text = payload.decode("utf-8")
+            if self.grammar_corrector:
+                text = self.grammar_corrector.correct_grammar(text)
+            return {"text": text}
+
+        if op == OP_STATS:
+            return tracer.summary()
+
+        raise ValueError(f"Unknown op {op}")
+
+
+class DaemonRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        """Serve requests on one persistent client connection"""
+        while True:
+            try:
+                op, payload = read_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                response, status = self.server.handle_op(op, payload), STATUS_OK
+                with self.server._stats_lock:
+                    self.server.requests_served += 1
+            except Exception as e:
+                print(f"❌ Daemon request failed: {e}")
+                response, status = {"error": str(e)}, STATUS_ERROR
+
+            try:
+                write_frame(self.request, status, json.dumps(response).encode("utf-8"))
+            except OSError:
+                return  # The client gave up (e.g. timed out) and closed its connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm ASR daemon for Heve AI")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='Unix socket path')
+    parser.add_argument('--no-grammar', action='store_true', help='Do not load Gramformer')
+    args = parser.parse_args()
+
+    from asr import ASREngine
+    from grammar_corrector import GrammarCorrector
+
+    # The client logs audio locally, so the daemon only holds models
+    asr = ASREngine.from_env(enable_logging=False)
+    grammar_corrector = None if args.no_grammar else GrammarCorrector(enable_correction=True)
+
+    socket_path = Path(args.socket)
+    if socket_path.exists():
+        socket_path.unlink()  # Stale socket from a previous run
+
+    server = ASRDaemon(str(socket_path), asr, grammar_corrector)
+    os.chmod(socket_path, 0o600)
+    server.warm_up()
+
+    print(f"🎧 ASR daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Sharded audio archive for logged dictations
+
+Utterances are appended to large shard files (FLAC-compressed when soundfile
+is available, raw 16-bit PCM otherwise) and located through an SQLite offset
+index, replacing one small WAV file per dictation. Reads memory-map the shard
+and slice out a single utterance; iter_utterances() walks shards in order so
+training reads are sequential.
+"""
+
+import fcntl
+import io
+import mmap
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+class AudioArchive:
+    def __init__(self, archive_dir="training/data/audio_archive", shard_size=64 * 1024 * 1024, codec="flac"):
+        """
+        shard_size: start a new shard once the current one reaches this many bytes
+        codec: "flac" (lossless, needs soundfile) or "pcm" (raw 16-bit samples)
+        """
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.codec = codec if codec == "pcm" or _has_soundfile() else "pcm"
+        
+        self._lock = threading.Lock()
+        self._maps = {}  # shard number -> mmap, remapped when the shard has grown
+        self._db = sqlite3.connect(str(self.archive_dir / "index.db"), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS utterances (
+                    utterance_id TEXT PRIMARY KEY,
+                    shard INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    num_samples INTEGER NOT NULL,
+                    sample_rate INTEGER NOT NULL,
+                    codec TEXT NOT NULL
+                )
+            """)
+    
+    def append(self, utterance_id, audio_data, sample_rate=16000):
+        """Append 16-bit mono PCM bytes under utterance_id"""
+        payload = self._encode(audio_data, sample_rate)
+        num_samples = len(audio_data) // 2
+        
+        # The file lock keeps appends from other processes (e.g. pack-audio while dictating) apart
+        with self._lock, open(self.archive_dir / "append.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            shard = self._current_shard(len(payload))
+            with open(self._shard_path(shard), 'ab') as f:
+                offset = f.tell()
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            # Index only after the data is on disk - a crash leaves unindexed bytes, never a dangling entry
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO utterances VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (utterance_id, shard, offset, len(payload), num_samples, sample_rate, self.codec)
+                )
+    
+    def read(self, utterance_id):
+        """Return (int16 samples, sample_rate) for one utterance"""
+        row = self._query(
+            "SELECT shard, offset, length, sample_rate, codec FROM utterances WHERE utterance_id = ?",
+            (utterance_id,)
+        )[:1]
+        if not row:
+            raise KeyError(utterance_id)
+        return self._read_entry(*row[0])
+    
+    def iter_utterances(self):
+        """Yield (utterance_id, int16 samples, sample_rate) in on-disk order"""
+        rows = self._query(
+            "SELECT utterance_id, shard, offset, length, sample_rate, codec FROM utterances ORDER BY shard, offset"
+        )
+        for utterance_id, *entry in rows:
+            yield (utterance_id, *self._read_entry(*entry))
+    
+    def utterance_ids(self):
+        """All utterance ids in on-disk order"""
+        rows = self._query("SELECT utterance_id FROM utterances ORDER BY shard, offset")
+        return [utterance_id for (utterance_id,) in rows]
+    
+    def __contains__(self, utterance_id):
+        return bool(self._query("SELECT 1 FROM utterances WHERE utterance_id = ?", (utterance_id,)))
+    
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM utterances")[0][0]
+    
+    def disk_usage(self) -> int:
+        """Total bytes used by shards and index"""
+        return sum(path.stat().st_size for path in self.archive_dir.iterdir() if path.is_file())
+    
+    def _query(self, sql, parameters=()):
+        """Run a read on the shared connection - append() writes to it from the logging thread"""
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+    
+    def _read_entry(self, shard, offset, length, sample_rate, codec):
+        payload = self._map(shard, offset + length)[offset:offset + length]
+        return self._decode(payload, codec), sample_rate
+    
+    def _map(self, shard, required_size):
+        """Memory-map a shard, remapping if it grew past the cached mapping"""
+        with self._lock:
+            mapped = self._maps.get(shard)
+            if mapped is None or len(mapped) < required_size:
+                if mapped is not None:
+                    mapped.close()
+                with open(self._shard_path(shard), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[shard] = mapped
+            return mapped
+    
+    def _current_shard(self, incoming_size):
+        """Shard to append to, rolling over when the current one is full"""
+        shards = sorted(int(path.stem.split('_')[1]) for path in self.archive_dir.glob("shard_*.bin"))
+        if not shards:
+            return 0
+        last = shards[-1]
+        if self._shard_path(last).stat().st_size + incoming_size > self.shard_size:
+            return last + 1
+        return last
+    
+    def _shard_path(self, shard):
+        return self.archive_dir / f"shard_{shard:05d}.bin"
+    
+    def _encode(self, audio_data, sample_rate):
+        if self.codec == "pcm":
+            return bytes(audio_data)
+        import soundfile as sf
+        buffer = io.BytesIO()
+        sf.write(buffer, np.frombuffer(audio_data, dtype=np.int16), sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue()
+    
+    @staticmethod
+    def _decode(payload, codec):
+        if codec == "pcm":
+            return np.frombuffer(payload, dtype=np.int16).copy()
+        import soundfile as sf
+        samples, _ = sf.read(io.BytesIO(payload), dtype='int16')
+        return samples
+
+
+def _has_soundfile():
+    try:
+        import soundfile  # noqa: F401
+        return True
+    except ImportError:
+        return False
@@ -0,0 +1,80 @@
+"""
+In-place PCM buffers for audio capture
+"""
+
+import numpy as np
+
+
+class PCMBuffer:
+    """
+    Preallocated, growable int16 buffer written in place by the audio callback.
+    Capacity doubles when full, so a recording costs O(log n) allocations
+    instead of one bytes object per chunk plus a final join.
+    """
+    
+    def __init__(self, initial_seconds=30, sample_rate=16000):
+        self._samples = np.empty(int(initial_seconds * sample_rate), dtype=np.int16)
+        self.length = 0
+        self.allocations = 1
+    
+    def write(self, data):
+        """Copy 16-bit PCM bytes to the end of the buffer"""
+        chunk = np.frombuffer(data, dtype=np.int16)
+        end = self.length + len(chunk)
+        if end > len(self._samples):
+            grown = np.empty(max(end, 2 * len(self._samples)), dtype=np.int16)
+            grown[:self.length] = self._samples[:self.length]
+            self._samples = grown
+            self.allocations += 1
+        self._samples[self.length:end] = chunk
+        self.length = end
+    
+    def truncate(self, length):
+        """Drop everything after the first length samples"""
+        self.length = min(self.length, max(length, 0))
+    
+    def samples(self):
+        """int16 view of the recorded samples (no copy)"""
+        return self._samples[:self.length]
+    
+    def view(self):
+        """Recorded audio as a zero-copy bytes-like memoryview"""
+        return memoryview(self.samples()).cast('B')
+    
+    def __len__(self):
+        return self.length
+
+
+class PreRollRing:
+    """
+    Fixed-size ring holding the most recent samples of an always-open stream.
+    Samples are addressed by absolute index (number of samples ever written),
+    so a recording can start at an exact point in the recent past.
+    """
+    
+    def __init__(self, capacity):
+        self._samples = np.zeros(max(1, capacity), dtype=np.int16)
+        self.end = 0  # Absolute index one past the newest sample
+    
+    def write(self, chunk):
+        """Append int16 samples, overwriting the oldest ones"""
+        capacity = len(self._samples)
+        total = len(chunk)
+        chunk = chunk[-capacity:]
+        start = (self.end + total - len(chunk)) % capacity
+        first = min(len(chunk), capacity - start)
+        self._samples[start:start + first] = chunk[:first]
+        self._samples[:len(chunk) - first] = chunk[first:]
+        self.end += total
+    
+    def read_from(self, index):
+        """Copy of the samples from absolute index to the newest (clipped to what is still held)"""
+        capacity = len(self._samples)
+        index = max(index, self.end - capacity, 0)
+        count = self.end - index
+        if count <= 0:
+            return np.empty(0, dtype=np.int16)
+        start = index % capacity
+        if start + count <= capacity:
+            return self._samples[start:start + count].copy()
+        return np.concatenate((self._samples[start:], self._samples[:start + count - capacity]))
@@ -3,22 +3,49 @@ Audio capture using PyAudio
 """
 
 import pyaudio
+import threading
 import wave
 import io
+import numpy as np
+
+from audio_buffer import PCMBuffer, PreRollRing
 
 
 class AudioCapture:
-    def __init__(self, sample_rate=16000, channels=1, chunk=1024):
+    def __init__(self, sample_rate=16000, channels=1, chunk=1024, initial_seconds=30,
+                 always_on=False, pre_roll_ms=300):
+        """
+        always_on=True keeps the input stream open between dictations so
+        start() does not pay device-open latency. The last pre_roll_ms of audio
+        is kept in a fixed-size ring and every recording begins that far before
+        the key press, so the first syllable is not clipped.
+        """
+        if always_on and channels != 1:
+            raise ValueError("Always-on capture supports mono audio only")
         self.sample_rate = sample_rate
         self.channels = channels
         self.chunk = chunk
+        self.initial_seconds = initial_seconds
+        self.always_on = always_on
         self.audio = pyaudio.PyAudio()
         self.stream = None
-        self.frames = []
+        self.buffer = PCMBuffer(initial_seconds, sample_rate * channels)
+        self.on_chunk = None
+        
+        # Always-on state: the ring is written by the callback, the window by start()/stop()
+        self.pre_roll_samples = int(sample_rate * pre_roll_ms / 1000)
+        # Margin for the part of the current chunk not yet delivered when a key is pressed
+        self.ring = PreRollRing(self.pre_roll_samples + 2 * chunk)
+        self._window = threading.Condition()
+        self._recording = False
+        self._start_index = 0
+        self._stop_index = None
+        self._clock = None  # (absolute sample index, ADC time) of the newest chunk
     
-    def start(self):
-        """Start recording audio"""
-        self.frames = []
+    def open(self):
+        """Open the input stream (kept open in always-on mode)"""
+        if self.stream is not None:
+            return
         self.stream = self.audio.open(
             format=pyaudio.paInt16,
             channels=self.channels,
@@ -29,22 +56,96 @@ class AudioCapture:
         )
         self.stream.start_stream()
     
-    def stop(self):
-        """Stop recording and return audio data"""
-        if self.stream:
+    def close(self):
+        """Close the input stream"""
+        if self.stream is not None:
             self.stream.stop_stream()
             self.stream.close()
+            self.stream = None
+    
+    def start(self, on_chunk=None):
+        """Start recording audio, optionally passing each chunk to on_chunk"""
+        if not self.always_on:
+            # Fresh buffer per recording - the previous one may still be queued for transcription
+            self.buffer = PCMBuffer(self.initial_seconds, self.sample_rate * self.channels)
+            self.on_chunk = on_chunk
+            self.open()
+            return
+        
+        self.open()
+        with self._window:
+            self.buffer = PCMBuffer(self.initial_seconds, self.sample_rate)
+            self.on_chunk = on_chunk
+            self._start_index = max(self._stream_index() - self.pre_roll_samples, 0)
+            self._stop_index = None
+            # Seed the recording with the pre-roll; later samples arrive through the callback
+            pre_roll = self.ring.read_from(self._start_index)
+            if len(pre_roll):
+                self._start_index = self.ring.end - len(pre_roll)
+            self._record(pre_roll, self._start_index)
+            self._recording = True
+    
+    def stop(self):
+        """Stop recording and return audio data (a bytes-like view of 16-bit PCM)"""
+        if not self.always_on:
+            self.close()
+            # Hand off the recorded samples without joining or copying
+            return self.buffer.view()
         
-        # Convert frames to bytes
-        audio_data = b''.join(self.frames)
-        return audio_data
+        with self._window:
+            if not self._recording:
+                return self.buffer.view()
+            self._stop_index = max(self._stream_index(), self._start_index)
+            # The release may fall inside a chunk the callback has not delivered yet
+            chunk_seconds = self.chunk / self.sample_rate
+            self._window.wait_for(lambda: self.ring.end >= self._stop_index, timeout=4 * chunk_seconds + 0.1)
+            self._recording = False
+            # Chunks delivered between the release and this call are cut off too
+            self.buffer.truncate(self._stop_index - self._start_index)
+            return self.buffer.view()
+    
+    def _stream_index(self):
+        """Absolute sample index of the current moment on the stream clock"""
+        if self._clock is None:
+            return self.ring.end
+        index, adc_time = self._clock
+        return index + int(round((self.stream.get_time() - adc_time) * self.sample_rate))
+    
+    def _record(self, samples, first_index):
+        """Append the part of samples (starting at absolute first_index) inside the recording window"""
+        start = max(self._start_index - first_index, 0)
+        end = len(samples)
+        if self._stop_index is not None:
+            end = min(end, self._stop_index - first_index)
+        if end > start:
+            part = samples[start:end]
+            self.buffer.write(part)
+            if self.on_chunk:
+                self.on_chunk(part.tobytes())
     
     def _callback(self, in_data, frame_count, time_info, status):
         """Audio stream callback"""
-        self.frames.append(in_data)
+        if not self.always_on:
+            self.buffer.write(in_data)
+            if self.on_chunk:
+                self.on_chunk(in_data)
+            return (in_data, pyaudio.paContinue)
+        
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        with self._window:
+            first_index = self.ring.end
+            adc_time = (time_info or {}).get('input_buffer_adc_time')
+            if adc_time:  # Some host APIs report 0 - fall back to chunk granularity
+                self._clock = (first_index, adc_time)
+            self.ring.write(samples)
+            if self._recording:
+                self._record(samples, first_index)
+            self._window.notify_all()
         return (in_data, pyaudio.paContinue)
     
     def __del__(self):
         """Cleanup PyAudio"""
+        if getattr(self, 'stream', None) is not None:
+            self.close()
         if hasattr(self, 'audio'):
-            self.audio.terminate() 
\ No newline at end of file
+            self.audio.terminate()
@@ -0,0 +1,256 @@
+"""
+Batch re-transcription of the logged training corpus
+
+Utterances are fanned out over a process pool. Every worker loads its own
+ASREngine with a bounded number of CPU threads, so throughput scales with
+cores instead of threads contending inside one model. Results are written
+back through DataLogger in batches and appended to a checkpoint file, so an
+interrupted run resumes where it stopped.
+
+    python src/data_manager.py retranscribe --workers 4
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+
+from data_logger import DataLogger
+
+CHECKPOINT_NAME = "retranscribe_checkpoint.jsonl"
+
+# DictionaryCorrector's default file, which the workers load
+DICTIONARY_FILE = Path("training/vocabulary_dictionary.json")
+
+# ASREngine.from_env settings that change the labels (besides backend, model and compute type)
+LABEL_ENV_SETTINGS = ("HEVE_LATENCY_BUDGET_MS", "HEVE_SHORT_UTTERANCE_SECONDS", "HEVE_CASCADE_MODEL",
+                      "HEVE_CASCADE_LOGPROB", "HEVE_CASCADE_NO_SPEECH", "HEVE_CASCADE_COMPRESSION",
+                      "HEVE_CASCADE_TERMS")
+
+# Per-process state created by _init_worker
+_worker = {}
+
+
+def _init_worker(data_dir, threads, grammar):
+    """Load one ASREngine per worker process, limited to `threads` CPU threads"""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass  # faster-whisper only - cpu_threads below bounds CTranslate2
+    
+    from asr import ASREngine
+    from audio_archive import AudioArchive
+    from punctuator import Punctuator
+    
+    data_dir = Path(data_dir)
+    archive_dir = data_dir / "audio_archive"
+    _worker["audio_dir"] = data_dir / "audio"
+    _worker["archive"] = AudioArchive(archive_dir) if (archive_dir / "index.db").exists() else None
+    _worker["asr"] = ASREngine.from_env(enable_logging=False, cpu_threads=threads, num_workers=1)
+    _worker["punctuator"] = Punctuator()
+    _worker["grammar_corrector"] = None
+    if grammar:
+        from grammar_corrector import GrammarCorrector
+        _worker["grammar_corrector"] = GrammarCorrector(enable_correction=True)
+
+
+def _load_audio(audio_file):
+    """int16 samples for a logged utterance from the archive or its WAV file, or None"""
+    archive = _worker["archive"]
+    if archive is not None and audio_file in archive:
+        samples, sample_rate = archive.read(audio_file)
+        return samples if sample_rate == _worker["asr"].sample_rate else None
+    
+    wav_path = _worker["audio_dir"] / audio_file
+    if not wav_path.exists():
+        return None
+    with wave.open(str(wav_path), 'rb') as wav_file:
+        if (wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2
+                or wav_file.getframerate() != _worker["asr"].sample_rate):
+            return None
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+
+def _transcribe_one(audio_file):
+    """Worker task: (audio_file, raw_text, final_text, audio_seconds); texts are None if the audio is missing"""
+    samples = _load_audio(audio_file)
+    if samples is None:
+        return audio_file, None, None, 0.0
+    
+    asr = _worker["asr"]
+    raw_text = asr._recognize(asr._bytes_to_numpy(samples))
+    text = asr._apply_dictionary(raw_text)
+    if text.strip():
+        text = _worker["punctuator"].add_punctuation(text)
+        if _worker["grammar_corrector"]:
+            text = _worker["grammar_corrector"].correct_grammar(text)
+    return audio_file, raw_text, text, len(samples) / asr.sample_rate
+
+
+class BatchTranscriber:
+    def __init__(self, data_dir="training/data", workers=None, threads_per_worker=None,
+                 grammar=False, overwrite_corrected=False, flush_every=32):
+        """
+        workers: worker processes (default: one per core, at most 8)
+        threads_per_worker: CPU threads per model (default: cores // workers)
+        overwrite_corrected: replace every corrected_transcription, hand edits
+        included (by default only empty or still-automatic labels are refreshed)
+        flush_every: results written to the database (and checkpoint) per batch
+        """
+        cores = os.cpu_count() or 1
+        self.data_dir = Path(data_dir)
+        self.workers = workers or min(cores, 8)
+        self.threads_per_worker = threads_per_worker or max(1, cores // self.workers)
+        self.grammar = grammar
+        self.overwrite_corrected = overwrite_corrected
+        self.flush_every = flush_every
+        self.logger = DataLogger(self.data_dir)
+        self.checkpoint_path = self.data_dir / CHECKPOINT_NAME
+    
+    def config(self) -> dict:
+        """What the labels depend on - a checkpoint from a different config is not resumed"""
+        return {
+            "backend": os.environ.get("HEVE_ASR_BACKEND", "whisper"),
+            "model_size": os.environ.get("HEVE_MODEL_SIZE", "base"),
+            "compute_type": os.environ.get("HEVE_COMPUTE_TYPE", "int8"),
+            "vad": os.environ.get("HEVE_VAD", "1") == "1",
+            "grammar": self.grammar,
+            "settings": {variable: os.environ[variable] for variable in LABEL_ENV_SETTINGS if variable in os.environ},
+            "dictionary": (hashlib.sha1(DICTIONARY_FILE.read_bytes()).hexdigest()
+                           if DICTIONARY_FILE.exists() else None),
+        }
+    
+    def pending(self, restart=False):
+        """
+        Utterances still to transcribe, archived ones first in on-disk order.
+        A missing or stale checkpoint (or restart) is started afresh
+        """
+        done = None if restart else self._read_checkpoint()
+        if done is None:
+            self._start_checkpoint()
+            done = set()
+        logged = self.logger.list_audio_files()
+        archived = self.logger.archive.utterance_ids() if self.logger.archive is not None else []
+        
+        ordered = [audio_file for audio_file in archived if audio_file not in done]
+        seen = set(archived)
+        ordered.extend(audio_file for audio_file in logged if audio_file not in seen and audio_file not in done)
+        return ordered
+    
+    def run(self, restart=False, limit=None) -> dict:
+        """Transcribe every pending utterance; returns throughput stats"""
+        pending = self.pending(restart)
+        if limit:
+            pending = pending[:limit]
+        
+        stats = {"transcribed": 0, "missing_audio": 0, "failed": 0, "audio_seconds": 0.0, "wall_seconds": 0.0,
+                 "workers": self.workers, "threads_per_worker": self.threads_per_worker}
+        if not pending:
+            print("✅ Nothing to transcribe")
+            return stats
+        
+        print(f"🚀 Re-transcribing {len(pending)} utterances with {self.workers} workers "
+              f"x {self.threads_per_worker} threads")
+        start_time = time.perf_counter()
+        results = []
+        # spawn: workers must not inherit a forked copy of the parent's thread pools
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(str(self.data_dir), self.threads_per_worker, self.grammar)) as pool:
+                queued = iter(pending)
+                in_flight = {}  # future -> audio_file
+                while True:
+                    # Keep a bounded number of tasks queued so progress is checkpointed steadily
+                    for audio_file in queued:
+                        in_flight[pool.submit(_transcribe_one, audio_file)] = audio_file
+                        if len(in_flight) >= self.workers * 4:
+                            break
+                    if not in_flight:
+                        break
+                    
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        audio_file = in_flight.pop(future)
+                        try:
+                            _, raw_text, text, audio_seconds = future.result()
+                        except BrokenProcessPool:
+                            raise  # A worker died (or failed to load its model) - nothing left to run on
+                        except Exception as e:
+                            # Not checkpointed, so the next run retries it
+                            print(f"❌ {audio_file}: {e}")
+                            stats["failed"] += 1
+                            continue
+                        if raw_text is None:
+                            stats["missing_audio"] += 1
+                        else:
+                            stats["transcribed"] += 1
+                            stats["audio_seconds"] += audio_seconds
+                        results.append((audio_file, raw_text, text))
+                    
+                    if len(results) >= self.flush_every:
+                        self._flush(results)
+                        results = []
+                        self._print_progress(stats, len(pending), start_time)
+        finally:
+            # Keep finished results even if the run is aborted
+            self._flush(results)
+        
+        stats["wall_seconds"] = time.perf_counter() - start_time
+        stats["audio_seconds_per_second"] = stats["audio_seconds"] / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+        return stats
+    
+    def _flush(self, results):
+        """Write a batch to the database, then mark it done in the checkpoint"""
+        if not results:
+            return
+        self.logger.update_transcriptions(
+            ((audio_file, raw_text, text) for audio_file, raw_text, text in results if raw_text is not None),
+            overwrite_corrected=self.overwrite_corrected
+        )
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+            for audio_file, raw_text, _ in results:
+                f.write(json.dumps({"audio_file": audio_file, "missing": raw_text is None}) + "\n")
+    
+    def _start_checkpoint(self):
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"config": self.config()}) + "\n")
+    
+    def _read_checkpoint(self):
+        """Audio files finished by an earlier run with the same config, or None if there is no such run"""
+        if not self.checkpoint_path.exists():
+            return None
+        done = set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Interrupted mid-write
+                if "config" in entry:
+                    if entry["config"] != self.config():
+                        print("⚠️ Checkpoint was made with a different configuration, starting over")
+                        return None
+                else:
+                    done.add(entry["audio_file"])
+        if done:
+            print(f"↩️ Resuming: {len(done)} utterances already done")
+        return done
+    
+    @staticmethod
+    def _print_progress(stats, total, start_time):
+        elapsed = time.perf_counter() - start_time
+        finished = stats["transcribed"] + stats["missing_audio"] + stats["failed"]
+        print(f"📈 {finished}/{total} done, {finished / elapsed:.1f} clips/s, "
+              f"{stats['audio_seconds'] / elapsed:.1f}x real time")
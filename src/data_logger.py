@@ -1,103 +1,270 @@
 """
 Data logging system to save audio and transcriptions for model improvement
+
+Transcriptions live in an SQLite database (WAL mode, indexed on audio_file)
+so logging and corrections are O(1) per dictation and crash-safe. Use
+export_csv() / import_csv() (or `python src/data_manager.py export-csv`)
+to exchange the classic transcriptions.csv with the training tools.
 """
 
 import csv
 import os
+import sqlite3
+import threading
 import wave
 import time
+import uuid
 from datetime import datetime
 from pathlib import Path
 
+from audio_archive import AudioArchive
+
+CSV_COLUMNS = ['timestamp', 'audio_file', 'transcription', 'corrected_transcription', 'audio_duration']
+
 
 class DataLogger:
-    def __init__(self, base_dir="training/data"):
+    def __init__(self, base_dir="training/data", use_archive=True):
+        """
+        use_archive=True appends audio to the sharded AudioArchive in
+        <base_dir>/audio_archive instead of writing one WAV per dictation
+        """
         self.base_dir = Path(base_dir)
         self.audio_dir = self.base_dir / "audio"
+        self.archive = AudioArchive(self.base_dir / "audio_archive") if use_archive else None
         self.csv_file = self.base_dir / "transcriptions.csv"
+        self.db_file = self.base_dir / "transcriptions.db"
         
         # Create directories
         self.base_dir.mkdir(parents=True, exist_ok=True)
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize CSV if it doesn't exist
-        if not self.csv_file.exists():
-            self._init_csv()
+        # Logging runs on background threads - share one connection behind a lock
+        self._lock = threading.Lock()
+        is_new = not self.db_file.exists()
+        self._db = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._init_db()
+        
+        # Carry over history from the old CSV log
+        if is_new and self.csv_file.exists():
+            imported = self.import_csv(self.csv_file)
+            print(f"📝 Imported {imported} rows from {self.csv_file} into {self.db_file}")
     
-    def _init_csv(self):
-        """Initialize CSV with headers"""
-        with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'audio_file', 'transcription', 'corrected_transcription', 'audio_duration'])
+    def _init_db(self):
+        """Initialize database schema"""
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes in WAL mode
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    audio_file TEXT NOT NULL UNIQUE,
+                    transcription TEXT NOT NULL,
+                    corrected_transcription TEXT NOT NULL DEFAULT '',
+                    audio_duration REAL NOT NULL,
+                    auto_corrected_transcription TEXT
+                )
+            """)
+            # Last corrected text produced automatically, to tell hand edits apart on re-transcription.
+            # NULL for rows logged before the column existed
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(transcriptions)")}
+            if "auto_corrected_transcription" not in columns:
+                self._db.execute("ALTER TABLE transcriptions ADD COLUMN auto_corrected_transcription TEXT")
+    
+    def pack_audio(self, delete_wavs=False):
+        """
+        Migrate the WAV directory into the audio archive.
+        Each file is verified by reading it back before it is (optionally) deleted.
+        Returns (packed, skipped, wav_bytes)
+        """
+        import numpy as np
+        
+        if self.archive is None:
+            raise ValueError("DataLogger was created without an audio archive")
+        
+        packed = skipped = wav_bytes = 0
+        for wav_path in sorted(self.audio_dir.glob("*.wav")):
+            with wave.open(str(wav_path), 'rb') as wav_file:
+                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                    print(f"⚠️ Skipping {wav_path.name}: not mono 16-bit")
+                    skipped += 1
+                    continue
+                sample_rate = wav_file.getframerate()
+                audio_data = wav_file.readframes(wav_file.getnframes())
+            
+            if wav_path.name not in self.archive:
+                self.archive.append(wav_path.name, audio_data, sample_rate)
+            packed += 1
+            wav_bytes += wav_path.stat().st_size
+            
+            if delete_wavs:
+                samples, _ = self.archive.read(wav_path.name)
+                if np.array_equal(samples, np.frombuffer(audio_data, dtype=np.int16)):
+                    wav_path.unlink()
+                else:
+                    print(f"⚠️ Keeping {wav_path.name}: archived copy does not match")
+        return packed, skipped, wav_bytes
+    
+    def _open_reader(self):
+        """Separate connection for long reads - WAL lets them run alongside logging"""
+        return sqlite3.connect(str(self.db_file))
     
     def save_transcription(self, audio_data, transcription, sample_rate=16000, corrected_transcription=None):
-        """Save audio file and transcription to CSV"""
+        """Save audio file and transcription to the database"""
         try:
-            # Generate unique filename
+            # Generate unique filename - the suffix separates saves within the same millisecond
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # millisecond precision
-            audio_filename = f"audio_{timestamp}.wav"
+            audio_filename = f"audio_{timestamp}_{uuid.uuid4().hex[:8]}.wav"
             audio_path = self.audio_dir / audio_filename
             
-            # Save audio as WAV file
-            with wave.open(str(audio_path), 'wb') as wav_file:
-                wav_file.setnchannels(1)  # mono
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(audio_data)
+            # Save audio to the archive (the filename is the utterance id) or as a WAV file
+            if self.archive is not None:
+                self.archive.append(audio_filename, audio_data, sample_rate)
+            else:
+                with wave.open(str(audio_path), 'wb') as wav_file:
+                    wav_file.setnchannels(1)  # mono
+                    wav_file.setsampwidth(2)  # 16-bit
+                    wav_file.setframerate(sample_rate)
+                    wav_file.writeframes(audio_data)
             
             # Calculate audio duration
             duration = len(audio_data) / (sample_rate * 2)  # 2 bytes per sample
             
-            # Append to CSV
-            with open(self.csv_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    timestamp,
-                    audio_filename,
-                    transcription,
-                    corrected_transcription or "",  # Use corrected version if provided
-                    f"{duration:.2f}"
-                ])
+            # Append one row
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT INTO transcriptions (timestamp, audio_file, transcription, corrected_transcription, "
+                    "audio_duration, auto_corrected_transcription) VALUES (?, ?, ?, ?, ?, ?)",
+                    (timestamp, audio_filename, transcription, corrected_transcription or "", round(duration, 2),
+                     corrected_transcription or "")
+                )
             
-            print(f"📝 Logged: {audio_filename} -> '{transcription}' (saved to {self.csv_file})")
+            print(f"📝 Logged: {audio_filename} -> '{transcription}' (saved to {self.db_file})")
             return audio_filename  # Return filename for later updates
-            
+        
         except Exception as e:
             print(f"❌ Failed to log data: {e}")
             return False
     
+    def read_audio(self, audio_file):
+        """(int16 samples, sample_rate) of a logged utterance from the archive or its WAV file, or None"""
+        import numpy as np
+        
+        if self.archive is not None and audio_file in self.archive:
+            return self.archive.read(audio_file)
+        audio_path = self.audio_dir / audio_file
+        if not audio_path.exists():
+            return None
+        with wave.open(str(audio_path), 'rb') as wav_file:
+            return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16), wav_file.getframerate()
+    
+    def iter_training_data(self):
+        """
+        Stream training examples one row at a time.
+        audio_path is None for archived utterances - load audio with read_audio(audio_file)
+        """
+        reader = self._open_reader()
+        try:
+            rows = reader.execute(
+                "SELECT audio_file, transcription, corrected_transcription, audio_duration "
+                "FROM transcriptions ORDER BY id"
+            )
+            for audio_file, transcription, corrected, duration in rows:
+                audio_path = self.audio_dir / audio_file
+                yield {
+                    'audio_file': audio_file,
+                    'audio_path': str(audio_path) if audio_path.exists() else None,
+                    'transcription': transcription,
+                    'corrected': corrected,
+                    'duration': float(duration)
+                }
+        finally:
+            reader.close()
+    
     def get_training_data(self):
-        """Load all training data from CSV"""
-        training_data = []
-        if self.csv_file.exists():
-            with open(self.csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    training_data.append({
-                        'audio_path': str(self.audio_dir / row['audio_file']),
-                        'transcription': row['transcription'],
-                        'corrected': row['corrected_transcription'],
-                        'duration': float(row['audio_duration'])
-                    })
-        return training_data
+        """Load all training data"""
+        return list(self.iter_training_data())
     
     def update_correction(self, audio_filename, corrected_text):
-        """Update a transcription with corrected text"""
-        # Read current CSV
-        rows = []
-        with open(self.csv_file, 'r', encoding='utf-8') as f:
+        """Update a transcription with the pipeline's corrected text"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE transcriptions SET corrected_transcription = ?, auto_corrected_transcription = ? "
+                "WHERE audio_file = ?",
+                (corrected_text, corrected_text, audio_filename)
+            )
+    
+    def update_transcriptions(self, results, overwrite_corrected=False):
+        """
+        Store re-transcriptions in one transaction.
+        results: iterable of (audio_filename, transcription, corrected_text).
+        corrected_transcription is refreshed where it is empty or still the last
+        automatic output; hand edits (and rows logged before automatic output was
+        tracked) are kept unless overwrite_corrected
+        """
+        with self._lock, self._db:
+            cursor = self._db.executemany(
+                "UPDATE transcriptions SET transcription = ?, corrected_transcription = "
+                "CASE WHEN ? OR corrected_transcription = '' "
+                "OR corrected_transcription = auto_corrected_transcription THEN ? ELSE corrected_transcription END, "
+                "auto_corrected_transcription = ? "
+                "WHERE audio_file = ?",
+                ((transcription, overwrite_corrected, corrected, corrected, audio_filename)
+                 for audio_filename, transcription, corrected in results)
+            )
+            return cursor.rowcount
+    
+    def list_audio_files(self):
+        """Every logged audio filename, oldest first"""
+        reader = self._open_reader()
+        try:
+            return [audio_file for (audio_file,) in reader.execute("SELECT audio_file FROM transcriptions ORDER BY id")]
+        finally:
+            reader.close()
+    
+    def export_csv(self, csv_path=None):
+        """Write all rows to transcriptions.csv (atomically) for the training tools"""
+        csv_path = Path(csv_path or self.csv_file)
+        temp_path = csv_path.with_name(csv_path.name + ".tmp")
+        count = 0
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            reader = self._open_reader()
+            try:
+                rows = reader.execute(f"SELECT {', '.join(CSV_COLUMNS)} FROM transcriptions ORDER BY id")
+                for timestamp, audio_file, transcription, corrected, duration in rows:
+                    writer.writerow([timestamp, audio_file, transcription, corrected, f"{duration:.2f}"])
+                    count += 1
+            finally:
+                reader.close()
+        os.replace(temp_path, csv_path)
+        return count
+    
+    def import_csv(self, csv_path):
+        """Insert or update rows from a CSV (e.g. after correcting transcriptions by hand)"""
+        count = 0
+        with open(csv_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            rows = list(reader)
-        
-        # Update the specific row
-        for row in rows:
-            if row['audio_file'] == audio_filename:
-                row['corrected_transcription'] = corrected_text
-                break
-        
-        # Write back to CSV
-        with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
-            if rows:
-                writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
+            rows = (
+                (
+                    row.get('timestamp') or "",
+                    row['audio_file'],
+                    row.get('transcription', row.get('original_transcription')) or "",
+                    row.get('corrected_transcription') or "",
+                    float(row.get('audio_duration') or 0.0)
+                )
+                for row in reader
+            )
+            with self._lock, self._db:
+                for row in rows:
+                    self._db.execute(
+                        "INSERT INTO transcriptions (timestamp, audio_file, transcription, corrected_transcription, audio_duration) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(audio_file) DO UPDATE SET "
+                        "transcription = excluded.transcription, "
+                        "corrected_transcription = excluded.corrected_transcription",
+                        row
+                    )
+                    count += 1
+        return count
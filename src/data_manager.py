@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Data Manager CLI tool for the logged training data
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+# --profile-startup: report import and load times when the command finishes
+from startup_profile import StartupProfile
+profile = StartupProfile.from_argv()
+
+from data_logger import DataLogger
+from timing import load_span_log, format_summary
+
+def stage(name):
+    """Time a startup step when profiling"""
+    return profile.stage(name) if profile else nullcontext()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage logged training data for Heve AI")
+    parser.add_argument('--data-dir', default='training/data', help='Training data directory')
+    parser.add_argument('--profile-startup', action='store_true', help='Print import and load times per component (to stderr)')
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    
+    # Export database to CSV
+    export_parser = subparsers.add_parser('export-csv', help='Export transcriptions to CSV for training')
+    export_parser.add_argument('path', nargs='?', help='Output CSV (default: <data-dir>/transcriptions.csv)')
+    
+    # Import CSV into database
+    import_parser = subparsers.add_parser('import-csv', help='Import or update transcriptions from a CSV')
+    import_parser.add_argument('path', help='CSV file to import')
+    
+    # Pack WAV files into the audio archive
+    pack_parser = subparsers.add_parser('pack-audio', help='Move logged WAV files into the sharded audio archive')
+    pack_parser.add_argument('--delete-wavs', action='store_true', help='Delete each WAV after verifying its archived copy')
+    
+    # Re-transcribe the corpus with the current model and dictionary
+    retranscribe_parser = subparsers.add_parser('retranscribe', help='Re-transcribe all logged audio in parallel')
+    retranscribe_parser.add_argument('--workers', type=int, help='Worker processes, one model each (default: cores, max 8)')
+    retranscribe_parser.add_argument('--threads-per-worker', type=int, help='CPU threads per model (default: cores / workers)')
+    retranscribe_parser.add_argument('--grammar', action='store_true', help='Also run Gramformer on each result')
+    retranscribe_parser.add_argument('--overwrite-corrected', action='store_true',
+                                     help='Replace hand-edited corrected transcriptions too (default: only refresh automatic ones)')
+    retranscribe_parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    retranscribe_parser.add_argument('--limit', type=int, help='Transcribe at most N utterances')
+    
+    # Per-stage latency percentiles
+    stats_parser = subparsers.add_parser('stats', help='Show p50/p95/p99 latency per dictation stage')
+    stats_parser.add_argument('--log', default=os.environ.get('HEVE_SPAN_LOG', 'logs/spans.jsonl'),
+                              help='JSONL span log written with HEVE_SPAN_LOG (default: %(default)s)')
+    stats_parser.add_argument('--since', type=float, help='Only spans from the last N hours')
+    stats_parser.add_argument('--window', type=int, default=1000, help='Most recent spans per stage (default: %(default)s)')
+    stats_parser.add_argument('--daemon', action='store_true', help="Query the running ASR daemon's in-memory histograms")
+    stats_parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    
+    args = parser.parse_args()
+    
+    if args.command is None:
+        parser.print_help()
+        return 0
+    
+    if args.command == 'stats':
+        return show_stats(args)
+    
+    with stage("data logger"):
+        logger = DataLogger(args.data_dir)
+    
+    if args.command == 'export-csv':
+        count = logger.export_csv(args.path)
+        print(f"Exported {count} rows to {args.path or logger.csv_file}")
+    
+    elif args.command == 'import-csv':
+        count = logger.import_csv(args.path)
+        print(f"Imported {count} rows from {args.path}")
+    
+    elif args.command == 'retranscribe':
+        from batch_transcribe import BatchTranscriber
+        transcriber = BatchTranscriber(
+            args.data_dir,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            grammar=args.grammar,
+            overwrite_corrected=args.overwrite_corrected
+        )
+        stats = transcriber.run(restart=args.restart, limit=args.limit)
+        if stats["transcribed"] or stats["missing_audio"] or stats["failed"]:
+            print(f"Re-transcribed {stats['transcribed']} utterances ({stats['missing_audio']} without audio, "
+                  f"{stats['failed']} failed - re-run to retry) "
+                  f"in {stats['wall_seconds']:.1f}s - {stats['audio_seconds_per_second']:.1f}x real time")
+            print("Run export-csv to refresh transcriptions.csv for the training tools")
+    
+    elif args.command == 'pack-audio':
+        packed, skipped, wav_bytes = logger.pack_audio(delete_wavs=args.delete_wavs)
+        archive_bytes = logger.archive.disk_usage()
+        print(f"Packed {packed} WAV files ({skipped} skipped)")
+        print(f"  WAV size:     {wav_bytes / 1e6:.1f} MB in {packed} files")
+        print(f"  Archive size: {archive_bytes / 1e6:.1f} MB in "
+              f"{sum(1 for _ in logger.archive.archive_dir.iterdir())} files")
+    
+    return 0
+
+def show_stats(args):
+    """Summarize span latencies from the JSONL log or the daemon"""
+    if args.daemon:
+        from asr_client import ASRClient, DaemonError
+        try:
+            summary = ASRClient().stats()
+        except DaemonError as e:
+            print(f"❌ {e}")
+            return 1
+    else:
+        if not os.path.exists(args.log):
+            print(f"❌ No span log at {args.log} - run Heve AI with HEVE_SPAN_LOG={args.log}")
+            return 1
+        since = time.time() - args.since * 3600 if args.since else None
+        summary = load_span_log(args.log, window=args.window, since=since).summary()
+    
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    elif not summary:
+        print("No spans recorded yet")
+    else:
+        print(format_summary(summary))
+    return 0
+
+if __name__ == "__main__":
+    status = main()
+    if profile:
+        profile.print_report()
+    sys.exit(status)
@@ -0,0 +1,170 @@
+"""
+Latency-budgeted Whisper decoding
+
+Whisper's temperature fallback re-decodes an utterance whenever the
+compression-ratio or log-probability checks fail, which produces our worst
+tail latencies. BudgetedDecoder runs that fallback loop itself: it picks a
+DecodingPolicy (beam size, best-of, fallback temperatures, conditioning) from
+the audio length and the per-utterance budget, only starts another
+temperature when its estimated cost still fits in the remaining budget, and
+otherwise returns the best hypothesis decoded so far.
+"""
+
+import math
+import time
+
+# Whisper's own thresholds for falling back to a higher temperature
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Whisper encodes fixed 30 s windows; encoder seconds per window on a reference CPU (base model)
+WINDOW_SECONDS = 30.0
+ENCODER_WINDOW_COST = 0.3
+
+
+class DecodingPolicy:
+    def __init__(self, name, beam_size, best_of, temperatures, condition_on_previous_text, cost):
+        """
+        cost: decoder seconds per audio second for one attempt on a reference
+        CPU (BudgetedDecoder scales it by the speed observed on this machine)
+        """
+        self.name = name
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.temperatures = temperatures
+        self.condition_on_previous_text = condition_on_previous_text
+        self.cost = cost
+
+    def options(self, temperature, condition_on_previous_text) -> dict:
+        """Backend options for one attempt at a single temperature (no internal fallback)"""
+        return {
+            "temperature": temperature,
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "condition_on_previous_text": condition_on_previous_text,
+        }
+
+    def describe(self) -> dict:
+        return {
+            "policy": self.name,
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "temperatures": list(self.temperatures),
+            "condition_on_previous_text": self.condition_on_previous_text,
+        }
+
+
+# Most to least expensive; the first one that fits the budget is used
+POLICIES = (
+    DecodingPolicy("accurate", beam_size=5, best_of=5, temperatures=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                   condition_on_previous_text=True, cost=0.25),
+    DecodingPolicy("balanced", beam_size=2, best_of=2, temperatures=(0.0, 0.4, 0.8),
+                   condition_on_previous_text=True, cost=0.1),
+    DecodingPolicy("fast", beam_size=1, best_of=1, temperatures=(0.0, 0.6),
+                   condition_on_previous_text=False, cost=0.05),
+)
+
+
+class BudgetedDecoder:
+    def __init__(self, budget_seconds, policies=POLICIES, long_audio_seconds=30.0, smoothing=0.2):
+        """
+        budget_seconds: wall-clock decode budget per utterance
+        long_audio_seconds: above this, conditioning on previous text is turned
+        off (it only spans Whisper's 30 s windows and can loop on long inputs)
+        smoothing: weight of each new observation in the machine speed estimate
+        """
+        self.budget_seconds = budget_seconds
+        self.policies = policies
+        self.long_audio_seconds = long_audio_seconds
+        self.smoothing = smoothing
+        self._speed = 1.0  # Observed attempt cost relative to the policies' reference costs
+        self.stats = {"utterances": 0, "budget_exhausted": 0, "fallbacks": 0,
+                      "policies": {policy.name: 0 for policy in policies}}
+
+    def choose(self, audio_seconds) -> DecodingPolicy:
+        """Most accurate policy whose first attempt plus one fallback fits the budget"""
+        for policy in self.policies:
+            if 2 * self.estimate(policy, audio_seconds) <= self.budget_seconds:
+                return policy
+        return self.policies[-1]
+
+    def estimate(self, policy, audio_seconds) -> float:
+        """Expected seconds for one attempt of policy on this machine"""
+        return self._speed * _nominal_cost(policy, audio_seconds)
+
+    def decode(self, decode_fn, audio_np, sample_rate=16000):
+        """
+        Run decode_fn(audio_np, **options) under the budget.
+        Returns (result, report) where report names the policy and every attempt
+        """
+        start = time.perf_counter()
+        audio_seconds = len(audio_np) / sample_rate
+        policy = self.choose(audio_seconds)
+        condition = policy.condition_on_previous_text and audio_seconds <= self.long_audio_seconds
+
+        best, best_score, attempts = None, None, []
+        budget_exhausted = False
+        for temperature in policy.temperatures:
+            elapsed = time.perf_counter() - start
+            if attempts and elapsed + self.estimate(policy, audio_seconds) > self.budget_seconds:
+                budget_exhausted = True
+                break
+
+            attempt_start = time.perf_counter()
+            result = decode_fn(audio_np, **policy.options(temperature, condition))
+            attempt_time = time.perf_counter() - attempt_start
+            self._observe(policy, attempt_time, audio_seconds)
+
+            passed, score = _assess(result)
+            attempts.append({"temperature": temperature, "seconds": round(attempt_time, 3),
+                             "passed": passed, "avg_logprob": round(score, 3)})
+            if passed:
+                best = result
+                break
+            if best is None or score > best_score:
+                best, best_score = result, score
+
+        self.stats["utterances"] += 1
+        self.stats["policies"][policy.name] += 1
+        self.stats["fallbacks"] += len(attempts) - 1
+        self.stats["budget_exhausted"] += budget_exhausted
+        report = {
+            **policy.describe(),
+            "condition_on_previous_text": condition,
+            "budget_seconds": self.budget_seconds,
+            "audio_seconds": round(audio_seconds, 2),
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+            "budget_exhausted": budget_exhausted,
+            "attempts": attempts,
+        }
+        return best, report
+
+    def _observe(self, policy, attempt_time, audio_seconds):
+        """Fold an observed attempt into the machine speed estimate"""
+        if audio_seconds <= 0:
+            return
+        relative = attempt_time / _nominal_cost(policy, audio_seconds)
+        self._speed += self.smoothing * (relative - self._speed)
+
+
+def _nominal_cost(policy, audio_seconds):
+    """Reference-CPU seconds for one attempt: encoder windows plus decoding"""
+    windows = max(1, math.ceil(audio_seconds / WINDOW_SECONDS))
+    return windows * ENCODER_WINDOW_COST + policy.cost * audio_seconds
+
+
+def _assess(result):
+    """(passes Whisper's fallback checks, mean avg_logprob) for a transcribe() result"""
+    segments = result.get("segments") or []
+    if not segments:
+        return True, 0.0
+    score = sum(segment.get("avg_logprob", 0.0) for segment in segments) / len(segments)
+    for segment in segments:
+        if segment.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD and segment.get("avg_logprob", 0.0) < LOGPROB_THRESHOLD:
+            continue  # Silence - Whisper would not fall back either
+        if segment.get("compression_ratio", 0.0) > COMPRESSION_RATIO_THRESHOLD:
+            return False, score
+        if segment.get("avg_logprob", 0.0) < LOGPROB_THRESHOLD:
+            return False, score
+    return True, score
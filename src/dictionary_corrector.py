@@ -1,15 +1,34 @@
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-import librosa
-import soundfile as sf
-import numpy as np
+from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_WORD_BOUNDARY = re.compile(r'\b')
+
+# Trie key marking the end of a complete phrase (never a single character)
+_PHRASE_END = "$end"
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex notion of a \\w character"""
+    return char.isalnum() or char == '_'
+
+
+def _is_boundary(text: str, position: int) -> bool:
+    """Match the regex \\b assertion at position"""
+    before = position > 0 and _is_word_char(text[position - 1])
+    after = position < len(text) and _is_word_char(text[position])
+    return before != after
+
 
 class DictionaryCorrector:
     def __init__(self, dict_file="training/vocabulary_dictionary.json"):
         self.dict_file = Path(dict_file)
         self.dictionary = self.load_dictionary()
+        self._build_matchers()
         self.audio_snippets_dir = Path("training/data/audio_snippets")
         self.audio_snippets_dir.mkdir(parents=True, exist_ok=True)
         
@@ -32,39 +51,122 @@ class DictionaryCorrector:
     
     def apply_real_time_corrections(self, text: str) -> str:
         """Apply real-time corrections using dictionary mappings"""
-        corrected_text = text
-        
-        # Sort replacements by length (longest first) to avoid partial replacements
-        replacements = sorted(self.dictionary["replacements"].items(), key=lambda x: len(x[0]), reverse=True)
-        
-        # Apply simple replacements (case-insensitive)
-        for wrong, correct in replacements:
-            # Use regex with word boundaries for partial matches in longer text
-            pattern = r'\b' + re.escape(wrong) + r'\b'
-            corrected_text = re.sub(pattern, correct, corrected_text, flags=re.IGNORECASE)
+        # Apply simple replacements (case-insensitive, longest match first)
+        corrected_text = self._replace_phrases(text)
         
         # Apply context-aware corrections
         corrected_text = self._apply_context_corrections(corrected_text)
         
         return corrected_text
     
+    def _build_matchers(self):
+        """
+        Compile the dictionary into matchers, once per dictionary change.
+        Replacements go into a character trie over the lowercased phrases, so a
+        single left-to-right scan finds the longest phrase at each word boundary
+        in time independent of the number of entries.
+        """
+        self._replacement_trie = {}
+        # Longest first so, like the old one-sub-per-entry loop, the first of
+        # several case variants of the same phrase wins
+        for wrong, correct in sorted(self.dictionary["replacements"].items(), key=lambda x: len(x[0]), reverse=True):
+            if not wrong:
+                continue
+            node = self._replacement_trie
+            for char in wrong.lower():
+                node = node.setdefault(char, {})
+            node.setdefault(_PHRASE_END, correct)
+        
+        context_words = self.dictionary["context_mappings"]
+        self._context_pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(word) for word in sorted(context_words, key=len, reverse=True)) + r')\b',
+            flags=re.IGNORECASE
+        ) if context_words else None
+        self._context_lookup = {word.lower(): word for word in context_words}
+        
+        terms = [term for term in self.dictionary["technical_terms"] if term]
+        self._term_pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + r')\b',
+            flags=re.IGNORECASE
+        ) if terms else None
+    
+    def contains_term(self, text: str) -> bool:
+        """
+        True if text contains a technical term or a known mis-transcription.
+        Context words are left out - they are mostly everyday words like "file"
+        """
+        if self._term_pattern and self._term_pattern.search(text):
+            return True
+        return next(self._find_phrases(text), None) is not None
+    
+    def _replace_phrases(self, text: str) -> str:
+        """Single pass over text replacing the longest dictionary phrase at each position"""
+        output = []
+        last = 0  # End of the text already copied to output
+        for start, end, replacement in self._find_phrases(text):
+            output.append(text[last:start])
+            output.append(replacement)
+            last = end
+        
+        if not output:
+            return text
+        output.append(text[last:])
+        return ''.join(output)
+    
+    def _find_phrases(self, text: str):
+        """Yield (start, end, replacement) for non-overlapping longest phrase matches, left to right"""
+        trie = self._replacement_trie
+        if not trie:
+            return
+        
+        last = 0  # End of the previous match
+        # Phrases only start on a regex word boundary (like \b in the old patterns)
+        for match in _WORD_BOUNDARY.finditer(text):
+            position = match.start()
+            if position < last or position == len(text) or text[position].lower()[:1] not in trie:
+                continue
+            match_end, replacement = self._longest_match(text, position)
+            if match_end is not None:
+                yield position, match_end, replacement
+                last = match_end
+    
+    def _longest_match(self, text: str, start: int):
+        """Walk the trie from start; return (end, replacement) of the longest phrase ending on a word boundary"""
+        node = self._replacement_trie
+        match_end, replacement = None, None
+        position = start
+        length = len(text)
+        while position < length:
+            for char in text[position].lower():
+                node = node.get(char)
+                if node is None:
+                    return match_end, replacement
+            position += 1
+            if _PHRASE_END in node and _is_boundary(text, position):
+                match_end, replacement = position, node[_PHRASE_END]
+        return match_end, replacement
+    
     def _apply_context_corrections(self, text: str) -> str:
         """Apply context-aware corrections based on surrounding words"""
-        for word, contexts in self.dictionary["context_mappings"].items():
-            # Simple context detection - can be enhanced
-            if word in text.lower():
-                # Check for coding context keywords
-                coding_keywords = ["python", "code", "script", "programming", "jupyter", "github"]
-                if any(keyword in text.lower() for keyword in coding_keywords):
-                    if "coding_context" in contexts:
-                        text = re.sub(r'\b' + word + r'\b', contexts["coding_context"], text, flags=re.IGNORECASE)
-                else:
-                    if "default" in contexts:
-                        text = re.sub(r'\b' + word + r'\b', contexts["default"], text, flags=re.IGNORECASE)
-        
-        return text
+        if not self._context_pattern:
+            return text
+        
+        # One tokenization pass decides the context for every mapped word
+        tokens = set(re.findall(r'\w+', text.lower()))
+        if not tokens.intersection(self._context_lookup):
+            return text
+        
+        # Check for coding context keywords
+        coding_keywords = ["python", "code", "script", "programming", "jupyter", "github"]
+        context = "coding_context" if tokens.intersection(coding_keywords) else "default"
+        
+        def resolve(match):
+            contexts = self.dictionary["context_mappings"][self._context_lookup[match.group(0).lower()]]
+            return contexts.get(context, match.group(0))
+        
+        return self._context_pattern.sub(resolve, text)
     
-    def extract_audio_snippet(self, audio_data: np.ndarray, sample_rate: int, 
+    def extract_audio_snippet(self, audio_data: "np.ndarray", sample_rate: int, 
                             word_position: float, word: str, correct_word: str) -> str:
         """Extract audio snippet around a specific word for dictionary training"""
         if not self.dictionary["audio_snippets"]["enabled"]:
@@ -88,7 +190,8 @@ class DictionaryCorrector:
         snippet_filename = f"snippet_{word}_{correct_word}_{timestamp}.wav"
         snippet_path = self.audio_snippets_dir / snippet_filename
         
-        # Save snippet
+        # Save snippet (soundfile only loads when a snippet is actually written)
+        import soundfile as sf
         sf.write(snippet_path, snippet, sample_rate)
         
         return str(snippet_path)
@@ -96,12 +199,14 @@ class DictionaryCorrector:
     def add_replacement(self, wrong_word: str, correct_word: str):
         """Add new replacement to dictionary"""
         self.dictionary["replacements"][wrong_word.lower()] = correct_word
+        self._build_matchers()
         self.save_dictionary()
     
     def add_technical_term(self, term: str):
         """Add technical term to dictionary"""
         if term not in self.dictionary["technical_terms"]:
             self.dictionary["technical_terms"].append(term)
+            self._build_matchers()
             self.save_dictionary()
     
     def suggest_corrections(self, original: str, corrected: str) -> List[Tuple[str, str]]:
@@ -4,11 +4,60 @@ Dictionary Manager CLI tool for managing vocabulary corrections
 """
 import argparse
 import json
+import sys
+import wave
+from contextlib import nullcontext
 from pathlib import Path
+
+# --profile-startup: report import and load times when the command finishes
+from startup_profile import StartupProfile
+profile = StartupProfile.from_argv()
+
 from dictionary_corrector import DictionaryCorrector
 
+def stage(name):
+    """Time a startup step when profiling"""
+    return profile.stage(name) if profile else nullcontext()
+
+def transcribe_wav(wav_path):
+    """Transcribe a WAV file, preferring the warm daemon over loading a model"""
+    from asr_client import ASRClient, DaemonError
+    
+    with wave.open(wav_path, 'rb') as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            print("❌ Expected a mono 16-bit WAV file")
+            return 1
+        sample_rate = wav_file.getframerate()
+        audio_data = wav_file.readframes(wav_file.getnframes())
+    
+    with stage("ASR daemon connection"):
+        client = ASRClient()
+        available = client.is_available()
+    if available:
+        try:
+            result = client.transcribe(audio_data, sample_rate)
+        except DaemonError as e:  # e.g. audio that is not 16 kHz
+            print(f"❌ {e}")
+            return 1
+        text, raw_text = result["text"], result["raw_text"]
+    else:
+        print(f"⚠️ ASR daemon not reachable at {client.socket_path}, loading model in-process")
+        with stage("ASR engine"):
+            from asr import ASREngine
+            asr = ASREngine.from_env(enable_logging=False)
+        if sample_rate != asr.sample_rate:
+            print(f"❌ Expected {asr.sample_rate} Hz audio, got {sample_rate} Hz")
+            return 1
+        raw_text = asr._recognize(asr._bytes_to_numpy(audio_data))
+        text = asr._apply_dictionary(raw_text)
+    
+    print(f"Raw:       {raw_text}")
+    print(f"Corrected: {text}")
+    return 0
+
 def main():
     parser = argparse.ArgumentParser(description="Manage vocabulary dictionary for Heve AI")
+    parser.add_argument('--profile-startup', action='store_true', help='Print import and load times per component (to stderr)')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Add replacement command
@@ -30,9 +79,17 @@ def main():
     # Stats
     stats_parser = subparsers.add_parser('stats', help='Show dictionary statistics')
     
+    # Transcribe a WAV file through the warm ASR daemon
+    transcribe_parser = subparsers.add_parser('transcribe', help='Transcribe a 16 kHz mono WAV file')
+    transcribe_parser.add_argument('wav', help='Path to WAV file')
+    
     args = parser.parse_args()
     
-    corrector = DictionaryCorrector()
+    if args.command == 'transcribe':
+        return transcribe_wav(args.wav)
+    
+    with stage("dictionary"):
+        corrector = DictionaryCorrector()
     
     if args.command == 'add':
         corrector.add_replacement(args.wrong, args.correct)
@@ -67,4 +124,7 @@ def main():
         parser.print_help()
 
 if __name__ == "__main__":
-    main()
+    status = main()
+    if profile:
+        profile.print_report()
+    sys.exit(status)
@@ -2,38 +2,113 @@
 Grammar correction using Gramformer for real-time text enhancement
 """
 
+import math
+import re
+import threading
 import time
-from typing import Optional
+import warnings
+from collections import OrderedDict
+from typing import List, Optional
+
+from timing import span, record
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:])\s+')
 
 
 class GrammarCorrector:
-    def __init__(self, enable_correction=True):
+    def __init__(self, enable_correction=True, background_load=False, batch_size=16,
+                 num_beams=1, length_headroom=8, max_words_per_piece=40,
+                 output_length_ratio=1.5, quantize=True, cache_size=1024):
+        """
+        background_load=True loads Gramformer on a daemon thread; until it is
+        ready correct_grammar passes text through unchanged.
+        Text is split into sentences (long ones further at clause boundaries, at
+        most max_words_per_piece words) that are corrected as padded batches of
+        batch_size. Decoding is greedy by default; each piece may generate
+        output_length_ratio times its input length plus length_headroom tokens,
+        and a piece whose correction hits that bound (or never ends) is kept as is.
+        quantize: run the model with dynamically quantized int8 linear layers
+        cache_size: corrected sentences kept in an LRU cache (0 disables it)
+        """
         self.enable_correction = enable_correction
+        self.batch_size = batch_size
+        self.num_beams = num_beams
+        self.length_headroom = length_headroom
+        self.max_words_per_piece = max_words_per_piece
+        self.output_length_ratio = output_length_ratio
+        self.quantize = quantize
+        
+        # Normalized sentence -> corrected sentence; stock phrases skip the model
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
         self.gramformer = None
         self.is_initialized = False
         
+        # Load progress: not_started/queued -> importing -> loading_model -> ready | failed
+        self.load_state = "not_started"
+        self.load_started_at = None
+        self.load_time = None
+        self.uncorrected_while_loading = 0
+        self._ready = threading.Event()
+        
         if enable_correction:
-            self._initialize_model()
+            if background_load:
+                self.load_state = "queued"
+                threading.Thread(target=self._initialize_model, daemon=True).start()
+            else:
+                self._initialize_model()
     
     def _initialize_model(self):
         """Initialize Gramformer model (lazy loading)"""
         try:
             print("🔧 Loading Gramformer model...")
-            start_time = time.time()
+            self.load_started_at = time.time()
             
+            self.load_state = "importing"
             from gramformer import Gramformer
             # Initialize with grammar correction model only (models=1)
+            self.load_state = "loading_model"
             self.gramformer = Gramformer(models=1, use_gpu=False)
+            if self.quantize:
+                try:
+                    self.gramformer.correction_model = self._quantize(self.gramformer.correction_model)
+                except Exception as e:
+                    print(f"⚠️ Could not quantize Gramformer, using float32 weights: {e}")
+                    self.quantize = False
             
-            load_time = time.time() - start_time
-            print(f"✅ Gramformer loaded in {load_time:.2f}s")
+            self.load_time = time.time() - self.load_started_at
+            record("grammar.load", self.load_time)
+            print(f"✅ Gramformer loaded in {self.load_time:.2f}s")
             self.is_initialized = True
+            self.load_state = "ready"
             
         except Exception as e:
             print(f"❌ Failed to load Gramformer: {e}")
             print("📝 Falling back to no grammar correction")
             self.enable_correction = False
             self.is_initialized = False
+            self.load_state = "failed"
+        finally:
+            self._ready.set()
+    
+    @staticmethod
+    def _quantize(model):
+        """Replace the model's nn.Linear layers with dynamic int8 ones for CPU inference"""
+        import torch
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # torch.ao quantization deprecation notices
+            return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background load finishes; True if the model is usable"""
+        if self.enable_correction:
+            self._ready.wait(timeout)
+        return self.is_enabled()
     
     def correct_grammar(self, text: str) -> str:
         """Apply grammar correction to text"""
@@ -41,29 +116,26 @@ class GrammarCorrector:
             return text
         
         if not self.is_initialized:
+            if not self._ready.is_set():
+                # Still loading in the background - dictation keeps working uncorrected
+                self.uncorrected_while_loading += 1
+                print(f"⏳ Gramformer still loading ({self.load_state}), returning original text")
+                return text
             print("⚠️ Gramformer not initialized, returning original text")
             return text
         
-        # Skip grammar correction for long text to prevent truncation
-        word_count = len(text.split())
-        if word_count > 50:
-            print(f"⚠️ Skipping grammar correction for long text ({word_count} words > 50 word limit)")
-            return text
-        
         try:
             start_time = time.time()
             
-            # Gramformer returns a set of corrections, take the first one
-            corrections = self.gramformer.correct(text)
-            corrected_text = list(corrections)[0] if corrections else text
+            corrected_text = self._correct_batch([text])[0]
             
             correction_time = time.time() - start_time
             
             # Only log if there was an actual change
             if corrected_text != text:
-                print(f"📝 Grammar correction ({correction_time:.0f}ms): '{text}' → '{corrected_text}'")
+                print(f"📝 Grammar correction ({correction_time * 1000:.0f}ms): '{text}' → '{corrected_text}'")
             else:
-                print(f"✅ No grammar changes needed ({correction_time:.0f}ms)")
+                print(f"✅ No grammar changes needed ({correction_time * 1000:.0f}ms)")
             
             return corrected_text
             
@@ -71,14 +143,159 @@ class GrammarCorrector:
             print(f"❌ Grammar correction failed: {e}")
             return text
     
+    def correct_many(self, texts: List[str]) -> List[str]:
+        """
+        Grammar-correct many texts through the same batched path, e.g. for
+        offline reprocessing of transcriptions.csv (waits for the model to load)
+        """
+        if not self.wait_until_ready():
+            return list(texts)
+        return self._correct_batch(texts)
+    
+    def _correct_batch(self, texts: List[str]) -> List[str]:
+        """Split texts into pieces, correct uncached pieces in batches and reassemble"""
+        pieces, owners = [], []
+        for index, text in enumerate(texts):
+            for piece in self._split_text(text):
+                pieces.append(piece)
+                owners.append(index)
+        
+        corrected_pieces = [self._cache_get(piece) for piece in pieces]
+        # Each distinct uncached piece is generated once
+        missing = list(dict.fromkeys(piece for piece, corrected in zip(pieces, corrected_pieces)
+                                     if corrected is None))
+        if missing:
+            with span("grammar.generate", pieces=len(missing)):
+                generated = dict(zip(missing, self._generate(missing)))
+            for piece, corrected in generated.items():
+                # Keep the original piece if the correction was cut off or the model dropped most of it;
+                # only accepted corrections are cached, so a rejected one is retried next time
+                if corrected is None or len(corrected.split()) < len(piece.split()) // 2:
+                    generated[piece] = piece
+                else:
+                    self._cache_put(piece, corrected)
+            corrected_pieces = [generated[piece] if corrected is None else corrected
+                                for piece, corrected in zip(pieces, corrected_pieces)]
+        
+        results = [[] for _ in texts]
+        for owner, corrected in zip(owners, corrected_pieces):
+            results[owner].append(corrected)
+        return [" ".join(result) if result else text for result, text in zip(results, texts)]
+    
+    def _cache_get(self, piece: str) -> Optional[str]:
+        """Cached correction of a piece, or None"""
+        if not self.cache_size:
+            return None
+        key = " ".join(piece.split())
+        with self._cache_lock:
+            corrected = self._cache.get(key)
+            if corrected is None:
+                self.cache_misses += 1
+            else:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return corrected
+    
+    def _cache_put(self, piece: str, corrected: str):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[" ".join(piece.split())] = corrected
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
+    
+    def _split_text(self, text: str) -> List[str]:
+        """Split text into sentences, breaking long ones at clause boundaries"""
+        pieces = []
+        for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+            if not sentence:
+                continue
+            if len(sentence.split()) <= self.max_words_per_piece:
+                pieces.append(sentence)
+                continue
+            
+            # Group clauses up to the word limit; hard-split clauses that are still too long
+            current = []
+            for clause in CLAUSE_BOUNDARY.split(sentence):
+                words = clause.split()
+                while len(words) > self.max_words_per_piece:
+                    if current:
+                        pieces.append(" ".join(current))
+                        current = []
+                    pieces.append(" ".join(words[:self.max_words_per_piece]))
+                    words = words[self.max_words_per_piece:]
+                if current and len(current) + len(words) > self.max_words_per_piece:
+                    pieces.append(" ".join(current))
+                    current = []
+                current.extend(words)
+            if current:
+                pieces.append(" ".join(current))
+        return pieces
+    
+    def _generate(self, sentences: List[str]) -> List[Optional[str]]:
+        """
+        Run Gramformer's seq2seq model over sentences as padded batches.
+        None for a sentence whose correction was cut off by its length bound
+        """
+        import torch
+        
+        tokenizer = self.gramformer.correction_tokenizer
+        model = self.gramformer.correction_model
+        outputs = [None] * len(sentences)
+        
+        # Sort by length so each batch pads as little as possible
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = tokenizer(
+                ["gec: " + sentences[i] for i in batch],  # Gramformer's correction prefix
+                return_tensors="pt",
+                padding=True,
+                truncation=True
+            ).to(model.device)
+            # A correction is about as long as its input
+            limits = [math.ceil(int(length) * self.output_length_ratio) + self.length_headroom
+                      for length in inputs["attention_mask"].sum(dim=1)]
+            with torch.no_grad():
+                generated = model.generate(
+                    **inputs,
+                    num_beams=self.num_beams,
+                    do_sample=False,
+                    max_new_tokens=max(limits),
+                    early_stopping=self.num_beams > 1
+                )
+            decoded = tokenizer.batch_decode(generated, skip_special_tokens=True)
+            for row, (i, corrected) in enumerate(zip(batch, decoded)):
+                # Column 0 is the decoder start token; a complete correction ends in EOS within its limit
+                ends = (generated[row, 1:] == tokenizer.eos_token_id).nonzero()
+                if len(ends) and int(ends[0]) < limits[row]:
+                    outputs[i] = corrected.strip()
+        return outputs
+    
     def is_enabled(self) -> bool:
         """Check if grammar correction is enabled and working"""
         return self.enable_correction and self.is_initialized
     
     def get_stats(self) -> dict:
         """Get correction statistics"""
+        load_elapsed = None
+        if self.load_started_at is not None:
+            load_elapsed = self.load_time if self.load_time is not None else time.time() - self.load_started_at
+        lookups = self.cache_hits + self.cache_misses
+        
         return {
             "enabled": self.enable_correction,
             "initialized": self.is_initialized,
-            "model_loaded": self.gramformer is not None
+            "model_loaded": self.gramformer is not None,
+            "load_state": self.load_state,
+            "load_elapsed": load_elapsed,
+            "load_time": self.load_time,
+            "uncorrected_while_loading": self.uncorrected_while_loading,
+            "quantized": self.quantize,
+            "cache_entries": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cache_evictions": self.cache_evictions
         }
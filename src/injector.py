@@ -1,48 +1,151 @@
 """
 Text injection - ultra-fast typing, minimal delays
+
+Injection runs on a dedicated worker thread fed by a queue. inject() returns
+immediately with a Future that resolves once the paste keystroke has been
+sent. The user's clipboard is restored in the background after restore_delay,
+and texts that arrive while a paste is still settling are coalesced into a
+single paste.
 """
 
 from pynput.keyboard import Controller, Key
+from concurrent.futures import Future
+import queue
 import subprocess
+import threading
 import time
 import os
 import pyperclip
 
+from timing import span, record
+
+_CLOSE = object()
+
 
 class TextInjector:
-    def __init__(self):
+    def __init__(self, restore_delay=0.1):
+        """
+        restore_delay: how long the target app gets to read the pasted
+        clipboard before the original content is put back
+        """
         self.keyboard = Controller()
         # Set ultra-fast typing speed (50x faster than default)
         self.keyboard._delay = 0.001  # 1ms delay instead of default ~50ms
+        self.restore_delay = restore_delay
+        
+        self._queue = queue.Queue()
+        self._original_clipboard = None
+        self._paste_pending = False  # Our text is on the clipboard, original not yet restored
+        self._settle_deadline = 0.0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
     
-    def type_text(self, text):
-        """Instant text injection via clipboard paste"""
+    def inject(self, text) -> Future:
+        """
+        Queue text for injection; the Future resolves to
+        {"method", "coalesced", "latency"} once the text has landed
+        """
+        future = Future()
         if not text.strip():
-            return
-        
-        try:
-            # Store current clipboard content
-            original_clipboard = pyperclip.paste()
-            
-            # Copy text to clipboard
-            pyperclip.copy(text + ' ')
+            future.set_result({"method": None, "coalesced": 0, "latency": 0.0})
+            return future
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+    
+    def type_text(self, text):
+        """Instant text injection via clipboard paste (blocks until the text has landed)"""
+        return self.inject(text).result()
+    
+    def close(self, timeout=1.0):
+        """Finish queued injections and restore the clipboard"""
+        self._queue.put(_CLOSE)
+        self._worker.join(timeout)
+    
+    def _run(self):
+        """Worker loop: paste queued texts, coalescing those that arrive while a paste settles"""
+        while True:
+            if not self._paste_pending:
+                batch = [self._queue.get()]
+            else:
+                # Give the target app time to read the clipboard, collecting new texts meanwhile
+                batch = []
+                while True:
+                    remaining = self._settle_deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                if not batch:
+                    self._restore_clipboard()
+                    continue
             
-            # Paste instantly with Cmd+V
-            self.keyboard.press(Key.cmd)
-            self.keyboard.press('v')
-            self.keyboard.release('v')
-            self.keyboard.release(Key.cmd)
+            # Anything else already queued goes into the same paste
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
             
-            # Restore original clipboard after a short delay
-            time.sleep(0.1)
-            pyperclip.copy(original_clipboard)
+            closing = any(item is _CLOSE for item in batch)
+            batch = [item for item in batch if item is not _CLOSE]
+            if batch:
+                self._paste(batch)
+            if closing:
+                if self._paste_pending:
+                    time.sleep(max(0.0, self._settle_deadline - time.perf_counter()))
+                    self._restore_clipboard()
+                return
+    
+    def _paste(self, batch):
+        """Inject a batch of texts as one paste, falling back to typing"""
+        text = "".join(item_text + ' ' for item_text, _, _ in batch)
+        try:
+            with span("inject.paste", coalesced=len(batch)):
+                # Store current clipboard content (unless it still holds our previous paste)
+                if not self._paste_pending:
+                    self._original_clipboard = pyperclip.paste()
+                
+                # Copy text to clipboard
+                pyperclip.copy(text)
+                
+                # Paste instantly with Cmd+V
+                self.keyboard.press(Key.cmd)
+                self.keyboard.press('v')
+                self.keyboard.release('v')
+                self.keyboard.release(Key.cmd)
             
-            print(f"✅ Text injected instantly: {text}")
+            # Restore the original clipboard once the app has had time to read it
+            self._paste_pending = True
+            self._settle_deadline = time.perf_counter() + self.restore_delay
+            method = "paste"
+            print(f"✅ Text injected instantly: {text.strip()}" +
+                  (f" ({len(batch)} results coalesced)" if len(batch) > 1 else ""))
         except Exception as e:
             print(f"❌ Injection failed: {e}")
             # Fallback to typing if clipboard fails
             try:
-                self.keyboard.type(text + ' ')
-                print(f"✅ Text injected via fallback typing: {text}")
+                self.keyboard.type(text)
+                method = "typing"
+                print(f"✅ Text injected via fallback typing: {text.strip()}")
             except Exception as e2:
-                print(f"❌ Both injection methods failed: {e2}") 
\ No newline at end of file
+                print(f"❌ Both injection methods failed: {e2}")
+                for _, future, _ in batch:
+                    future.set_exception(e2)
+                return
+        
+        landed = time.perf_counter()
+        for _, future, submitted_at in batch:
+            record("inject.latency", landed - submitted_at)
+            future.set_result({"method": method, "coalesced": len(batch), "latency": landed - submitted_at})
+    
+    def _restore_clipboard(self):
+        """Put the user's clipboard content back"""
+        try:
+            with span("inject.clipboard_restore"):
+                pyperclip.copy(self._original_clipboard or "")
+        except Exception as e:
+            print(f"⚠️ Could not restore clipboard: {e}")
+        self._original_clipboard = None
+        self._paste_pending = False
@@ -12,7 +12,7 @@ class KeyListener:
         self.on_release_callback = on_release
         self.listener = None
         self.is_pressed = False
-        self.is_processing = False  # Prevent overlapping dictation
+        self.is_processing = False  # Set while the release callback runs (it only queues the job)
         self.last_release_time = 0  # Debounce protection
         self.debounce_delay = 0.5  # 500ms minimum between dictations
     
@@ -0,0 +1,189 @@
+"""
+Asynchronous dictation pipeline - transcription runs on worker threads while
+results are injected strictly in the order the dictations were recorded
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from timing import span, record
+
+STAGES = ("queue_wait", "asr", "postprocess", "inject_wait", "inject", "total")
+
+
+class DictationJob:
+    def __init__(self, job_id, audio_data, stream=None, queue_depth=0):
+        self.job_id = job_id
+        self.audio_data = audio_data
+        self.stream = stream  # TranscriptionStream when recorded in streaming mode
+        self.queue_depth = queue_depth  # Jobs already waiting or running at submit time
+        self.submitted_at = time.perf_counter()
+        self.text = ""
+        self.corrected_text = ""
+        self.audio_log_data = None
+        self.timings = {}  # Seconds per stage (see STAGES)
+        self.injected = Future()  # Resolves to the injector's result once the text has landed (None if empty)
+
+    def record(self) -> dict:
+        """Summary for stats and logs"""
+        return {
+            "job_id": self.job_id,
+            "queue_depth": self.queue_depth,
+            "audio_seconds": len(self.audio_data) / 32000 if self.audio_data else 0.0,
+            **{name: round(value, 4) for name, value in self.timings.items()}
+        }
+
+
+class DictationPipeline:
+    def __init__(self, asr, punctuator, grammar_corrector, injector, num_workers=1, history_size=100):
+        """
+        Stages: submit (listener thread) -> transcribe + post-process (worker pool)
+        -> inject in submission order (single injector thread) -> log (background)
+        """
+        self.asr = asr
+        self.punctuator = punctuator
+        self.grammar_corrector = grammar_corrector
+        self.injector = injector
+
+        self._ids = itertools.count()
+        self._jobs = queue.Queue()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+        # Finished jobs wait here until every earlier job has been injected
+        self._finished = {}
+        self._next_to_inject = 0
+        self._finished_ready = threading.Condition()
+
+        self.history = deque(maxlen=history_size)
+
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, num_workers))]
+        for worker in self._workers:
+            worker.start()
+        threading.Thread(target=self._inject_in_order, daemon=True).start()
+
+    def submit(self, audio_data, stream=None) -> DictationJob:
+        """Queue a recorded dictation and return immediately"""
+        with self._in_flight_lock:
+            job = DictationJob(next(self._ids), audio_data, stream, queue_depth=self._in_flight)
+            self._in_flight += 1
+        self._jobs.put(job)
+        if job.queue_depth:
+            print(f"📥 Queued dictation #{job.job_id} ({job.queue_depth} ahead)")
+        return job
+
+    def get_stats(self) -> dict:
+        """Queue depth now plus average stage timings over recent jobs"""
+        with self._in_flight_lock:
+            in_flight = self._in_flight
+        stats = {"in_flight": in_flight, "completed": len(self.history)}
+        if self.history:
+            for name in STAGES:
+                stats[f"avg_{name}"] = sum(job.get(name, 0.0) for job in self.history) / len(self.history)
+            stats["max_queue_depth"] = max(job["queue_depth"] for job in self.history)
+        return stats
+
+    def _work(self):
+        """Worker loop: transcription and post-processing"""
+        while True:
+            job = self._jobs.get()
+            started = time.perf_counter()
+            job.timings["queue_wait"] = started - job.submitted_at
+            try:
+                self._process(job)
+            except Exception as e:
+                print(f"❌ Dictation #{job.job_id} failed: {e}")
+                job.corrected_text = ""
+            job.finished_at = time.perf_counter()
+
+            with self._finished_ready:
+                self._finished[job.job_id] = job
+                self._finished_ready.notify_all()
+
+    def _process(self, job):
+        """Run ASR, punctuation and grammar correction for one job"""
+        start = time.perf_counter()
+        if job.stream:
+            job.text, job.audio_log_data = job.stream.finish()
+        else:
+            job.text, job.audio_log_data = self.asr.transcribe(job.audio_data)
+        job.timings["asr"] = time.perf_counter() - start
+
+        if not job.text.strip():
+            return
+
+        start = time.perf_counter()
+        # Add advanced punctuation and capitalization
+        with span("punctuate"):
+            formatted_text = self.punctuator.add_punctuation(job.text)
+        # Apply grammar correction
+        with span("grammar"):
+            job.corrected_text = self.grammar_corrector.correct_grammar(formatted_text)
+        job.timings["postprocess"] = time.perf_counter() - start
+
+    def _inject_in_order(self):
+        """Injector loop: inject finished jobs strictly by job id"""
+        while True:
+            with self._finished_ready:
+                while self._next_to_inject not in self._finished:
+                    self._finished_ready.wait()
+                job = self._finished.pop(self._next_to_inject)
+                self._next_to_inject += 1
+
+            job.inject_started = time.perf_counter()
+            job.timings["inject_wait"] = job.inject_started - job.finished_at
+            if job.corrected_text:
+                # 🚀 INJECT TEXT FIRST - HIGHEST PRIORITY
+                # The injector queue keeps submission order and coalesces back-to-back results
+                try:
+                    injected = self.injector.inject(job.corrected_text)
+                except Exception as e:
+                    # e.g. the injector was closed - keep the loop alive for later jobs
+                    print(f"❌ Dictation #{job.job_id} was not injected: {e}")
+                    self._finish(job, None)
+                    continue
+                injected.add_done_callback(lambda injected, job=job: self._finish(job, injected))
+            else:
+                print("No speech detected")
+                self._finish(job, None)
+
+    def _finish(self, job, injected):
+        """Record timings once the text has landed, then log in the background"""
+        result = None
+        if injected is not None:
+            try:
+                result = injected.result()
+                print(f"Typed: {job.corrected_text}")
+                # Log to CSV in background AFTER text injection
+                threading.Thread(target=self._log, args=(job,), daemon=True).start()
+            except Exception as e:
+                print(f"❌ Dictation #{job.job_id} was not injected: {e}")
+        job.timings["inject"] = time.perf_counter() - job.inject_started
+        job.timings["total"] = time.perf_counter() - job.submitted_at
+
+        with self._in_flight_lock:
+            self._in_flight -= 1
+        self.history.append(job.record())
+        for name, value in job.timings.items():
+            record(f"pipeline.{name}", value)
+        print(f"⏱️ Dictation #{job.job_id}: " + ", ".join(
+            f"{name} {value * 1000:.0f}ms" for name, value in job.timings.items()))
+        job.injected.set_result(result)
+
+    def _log(self, job):
+        """Save audio and final transcription for training"""
+        logger = getattr(self.asr, "logger", None)
+        if not (job.audio_log_data and logger):
+            return
+        audio_data_for_log, raw_text, sample_rate = job.audio_log_data
+        audio_filename = logger.save_transcription(audio_data_for_log, raw_text, sample_rate)
+        if audio_filename:
+            logger.update_correction(audio_filename, job.corrected_text)
+            if job.corrected_text != job.text:
+                print(f"📝 Grammar correction applied: '{job.text}' → '{job.corrected_text}'")
+            else:
+                print(f"📝 Final transcription logged: '{job.corrected_text}'")
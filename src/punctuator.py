@@ -32,48 +32,90 @@ class Punctuator:
             'on a separate note', 'separately', 'also', 'additionally',
             'furthermore', 'however', 'meanwhile', 'therefore'
         ]
-    
-    def add_punctuation(self, text):
-        """Add enhanced punctuation and capitalization"""
-        if not text.strip():
-            return text
-        
-        # Clean and normalize text
-        formatted = text.strip().lower()
         
+        self._compile_rules()
+    
+    def _compile_rules(self):
+        r"""
+        Compile every rule once into an ordered rule table.
+        
+        Clause rules used to be regexes like ([^,]{15,})\s+(i think)\s+, which
+        backtrack over every start position of a comma-free run (quadratic on
+        long dictations). They are now run-scoped scans: split the text on the
+        run delimiters, find the last whitespace-delimited occurrence of the
+        phrase in each run and insert the mark when enough text precedes it.
+        That is exactly what the greedy regex matched, in linear time.
+        """
         # Fix common grammar issues
-        formatted = re.sub(r'\bseparate notes\b', 'separate note', formatted)
-        formatted = re.sub(r'\bwhat you done\b', 'what you did', formatted)
+        self._grammar_fixes = [
+            (re.compile(r'\bseparate notes\b'), 'separate note'),
+            (re.compile(r'\bwhat you done\b'), 'what you did'),
+        ]
+        
+        # Add commas after greetings at the start of sentences (at most one can match)
+        self._greeting_pattern = re.compile(
+            r'^(' + '|'.join(re.escape(greeting) for greeting in self.greetings) + r')\s+([^,])',
+            flags=re.IGNORECASE
+        )
         
-        # Add commas after greetings at the start of sentences
-        for greeting in self.greetings:
-            pattern = r'^(' + re.escape(greeting) + r')\s+([^,])'
-            formatted = re.sub(pattern, r'\1, \2', formatted, flags=re.IGNORECASE)
+        # (phrase, minimum preceding run length, run delimiters, mark), applied in order
+        self._clause_rules = []
         
-        # Add commas before independent clauses (only after substantial content)
+        # Add commas before independent clauses (only after substantial content, 15+ chars)
         for starter in self.independent_clause_starters:
-            # Only add comma if there's substantial content before (15+ chars)
-            pattern = r'([^,]{15,})\s+(' + re.escape(starter) + r')\s+'
-            formatted = re.sub(pattern, r'\1, \2 ', formatted, flags=re.IGNORECASE)
+            self._clause_rules.append((starter, 15, ',', ','))
         
         # Add commas before some conjunctions (but be selective)
         selective_triggers = ['but', 'so', 'yet', 'however', 'therefore']
         for trigger in selective_triggers:
-            pattern = r'([^,]{10,})\s+(' + re.escape(trigger) + r')\s+'
-            formatted = re.sub(pattern, r'\1, \2 ', formatted, flags=re.IGNORECASE)
+            self._clause_rules.append((trigger, 10, ',', ','))
         
         # Handle sentence breaks for specific patterns
-        formatted = re.sub(r'\s+(on a separate note)\s+', r'. \1, ', formatted, flags=re.IGNORECASE)
-        formatted = re.sub(r'([^.!?]{30,})\s+(i would love to)\s+', r'\1. \2 ', formatted, flags=re.IGNORECASE)
+        self._separate_note_pattern = re.compile(r'\s+(on a separate note)\s+', flags=re.IGNORECASE)
+        self._sentence_rules = [('i would love to', 30, '.!?', '.')]
         
         # Add commas after long introductory phrases (25+ chars)
-        formatted = re.sub(r'^([^,]{25,})\s+(i\s)', r'\1, \2', formatted, flags=re.IGNORECASE)
+        self._intro_pattern = re.compile(r'^([^,]{25,})\s+(i\s)', flags=re.IGNORECASE)
+        
+        self._capital_i_pattern = re.compile(r'\bi\b')
+        self._sentence_start_pattern = re.compile(r'(^|[.!?]\s+)([a-z])')
+        
+        # Clean up punctuation issues
+        self._cleanup = [
+            (re.compile(r',\s*\.'), '.'),  # Remove comma before period
+            (re.compile(r',\s*,'), ','),  # Remove double commas
+            (re.compile(r'\s+([,.!?])'), r'\1'),  # Remove space before punctuation
+            (re.compile(r'([,.!?])\s+'), r'\1 '),  # Ensure space after punctuation
+            (re.compile(r'\s+'), ' '),  # Remove extra spaces
+        ]
+    
+    def add_punctuation(self, text):
+        """Add enhanced punctuation and capitalization"""
+        if not text.strip():
+            return text
+        
+        # Clean and normalize text
+        formatted = text.strip().lower()
+        
+        for pattern, replacement in self._grammar_fixes:
+            formatted = pattern.sub(replacement, formatted)
+        
+        formatted = self._greeting_pattern.sub(r'\1, \2', formatted)
+        
+        for phrase, min_prefix, delimiters, mark in self._clause_rules:
+            formatted = self._mark_before_phrase(formatted, phrase, min_prefix, delimiters, mark)
+        
+        formatted = self._separate_note_pattern.sub(r'. \1, ', formatted)
+        for phrase, min_prefix, delimiters, mark in self._sentence_rules:
+            formatted = self._mark_before_phrase(formatted, phrase, min_prefix, delimiters, mark)
+        
+        formatted = self._intro_pattern.sub(r'\1, \2', formatted)
         
         # Capitalize 'I' throughout the text
-        formatted = re.sub(r'\bi\b', 'I', formatted)
+        formatted = self._capital_i_pattern.sub('I', formatted)
         
         # Capitalize first letter of sentences
-        formatted = re.sub(r'(^|[.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), formatted)
+        formatted = self._sentence_start_pattern.sub(lambda m: m.group(1) + m.group(2).upper(), formatted)
         
         # Ensure first letter of entire text is capitalized
         if formatted:
@@ -83,11 +125,48 @@ class Punctuator:
         if not formatted.endswith(('.', '!', '?')):
             formatted += '.'
         
-        # Clean up punctuation issues
-        formatted = re.sub(r',\s*\.', '.', formatted)  # Remove comma before period
-        formatted = re.sub(r',\s*,', ',', formatted)   # Remove double commas
-        formatted = re.sub(r'\s+([,.!?])', r'\1', formatted)  # Remove space before punctuation
-        formatted = re.sub(r'([,.!?])\s+', r'\1 ', formatted)  # Ensure space after punctuation
-        formatted = re.sub(r'\s+', ' ', formatted)     # Remove extra spaces
+        for pattern, replacement in self._cleanup:
+            formatted = pattern.sub(replacement, formatted)
+        
+        return formatted.strip()
+    
+    @staticmethod
+    def _mark_before_phrase(text, phrase, min_prefix, delimiters, mark):
+        r"""
+        Linear-time equivalent of
+        re.sub(r'([^<delimiters>]{min_prefix,})\s+(<phrase>)\s+', r'\1<mark> \2 ', text)
+        """
+        if phrase not in text:
+            return text
         
-        return formatted.strip() 
\ No newline at end of file
+        # Runs of text between delimiters, with the delimiters kept at odd indexes
+        pieces = re.split('([' + re.escape(delimiters) + '])', text)
+        runs, separators = pieces[::2], pieces[1::2]
+        
+        for index, run in enumerate(runs):
+            position = _last_spaced_occurrence(run, phrase)
+            # The greedy prefix ends on the whitespace just before the phrase
+            if position is not None and position - 1 >= min_prefix:
+                after = position + len(phrase)
+                while after < len(run) and run[after].isspace():
+                    after += 1
+                runs[index] = run[:position - 1] + mark + ' ' + phrase + ' ' + run[after:]
+        
+        pieces = [runs[0]]
+        for separator, run in zip(separators, runs[1:]):
+            pieces.append(separator)
+            pieces.append(run)
+        return ''.join(pieces)
+
+
+def _last_spaced_occurrence(run, phrase):
+    """Index of the last occurrence of phrase with whitespace on both sides, or None"""
+    end = len(run)
+    while True:
+        position = run.rfind(phrase, 0, end)
+        if position < 1:
+            return None
+        after = position + len(phrase)
+        if run[position - 1].isspace() and after < len(run) and run[after].isspace():
+            return position
+        end = after - 1  # Allow overlapping earlier occurrences
@@ -0,0 +1,90 @@
+"""
+Startup-time profile for --profile-startup
+
+StartupProfile hooks the import machinery and times every top-level import,
+charging nested imports to the module that triggered them, so slow
+dependencies show up under the component that pulled them in. Model loads and
+other startup steps are timed with stage(). The report goes to stderr so a
+command's own output stays parseable.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    def __init__(self):
+        self.imports = []  # (module, seconds), first import only
+        self.stages = []  # (name, seconds)
+        self._start = time.perf_counter()
+        self._local = threading.local()  # Per-thread import nesting depth
+        self._original_import = None
+
+    @classmethod
+    def from_argv(cls, argv=None):
+        """
+        A started profile if --profile-startup is in argv (the flag is removed),
+        else None. Call before the script's own imports
+        """
+        argv = sys.argv if argv is None else argv
+        if "--profile-startup" not in argv:
+            return None
+        argv.remove("--profile-startup")
+        return cls().start()
+
+    def start(self):
+        """Time imports from now on"""
+        self._original_import = original = builtins.__import__
+
+        def timed_import(name, *args, **kwargs):
+            depth = getattr(self._local, "depth", 0)
+            if depth or name in sys.modules:
+                self._local.depth = depth + 1
+                try:
+                    return original(name, *args, **kwargs)
+                finally:
+                    self._local.depth = depth
+            self._local.depth = 1
+            start = time.perf_counter()
+            try:
+                return original(name, *args, **kwargs)
+            finally:
+                self._local.depth = 0
+                self.imports.append((name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+        return self
+
+    def stop(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a startup step such as a model load (imports inside it count towards it too)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def report(self, top=15) -> str:
+        """Slowest imports and all stages, in milliseconds"""
+        total = time.perf_counter() - self._start
+        lines = [f"⏱️ Startup profile ({total * 1000:.0f}ms since the profile started)", "  Imports:"]
+        for name, seconds in sorted(self.imports, key=lambda item: -item[1])[:top]:
+            lines.append(f"    {name:<32} {seconds * 1000:>8.1f}ms")
+        lines.append(f"    {'(all imports)':<32} {sum(seconds for _, seconds in self.imports) * 1000:>8.1f}ms")
+        if self.stages:
+            lines.append("  Components:")
+            for name, seconds in self.stages:
+                lines.append(f"    {name:<32} {seconds * 1000:>8.1f}ms")
+        return "\n".join(lines)
+
+    def print_report(self):
+        self.stop()
+        print(self.report(), file=sys.stderr)
@@ -0,0 +1,165 @@
+"""
+Streaming transcription - decode audio while the trigger key is still held
+"""
+
+import queue
+import threading
+import time
+
+from timing import record
+
+
+class TranscriptionStream:
+    def __init__(self, asr, sample_rate=16000, step_seconds=1.0, max_window_seconds=15.0,
+                 min_tail_seconds=0.1):
+        """
+        Incrementally transcribe audio chunks as they arrive.
+
+        Every `step_seconds` of new audio the uncommitted window is re-decoded.
+        Complete segments that come out the same on two consecutive passes are
+        committed (local agreement), so on release only the unfinished tail is
+        decoded. Windows longer than `max_window_seconds` force a commit of all
+        complete segments to bound the tail.
+        """
+        self.asr = asr
+        self.sample_rate = sample_rate
+        self.step_samples = int(step_seconds * sample_rate)
+        self.max_window_samples = int(max_window_seconds * sample_rate)
+        self.min_tail_samples = int(min_tail_seconds * sample_rate)
+
+        self._queue = queue.Queue()
+        self._buffer = bytearray()  # Raw 16-bit PCM received so far
+        self._committed_texts = []
+        self._committed_samples = 0  # Samples covered by committed text
+        self._decoded_samples = 0  # Buffer length at the last partial decode
+        self._previous_segments = []
+        self._worker = threading.Thread(target=self._run, daemon=True)
+
+        self.partial_text = ""
+        self.stats = {
+            "partial_decodes": 0,
+            "committed_seconds": 0.0,
+            "tail_seconds": 0.0,
+            "time_to_first_partial": None,
+            "release_to_final": None,
+        }
+
+    def start(self):
+        """Start the background decoding worker"""
+        self._start_time = time.perf_counter()
+        self._worker.start()
+        return self
+
+    def feed(self, chunk):
+        """Queue a chunk of 16-bit PCM audio (safe to call from the audio callback)"""
+        self._queue.put(chunk)
+
+    def finish(self):
+        """Decode the uncommitted tail and return (text, audio_log_data)"""
+        release_time = time.perf_counter()
+        self._queue.put(None)
+        self._worker.join()
+
+        if not self._buffer:
+            return "", None
+
+        try:
+            tail_texts = []
+            tail = self._buffer[self._committed_samples * 2:]
+            if len(tail) // 2 >= self.min_tail_samples:
+                result = self.asr._recognize_result(self.asr._bytes_to_numpy(bytes(tail)),
+                                                    **self._prompt_options())
+                tail_texts = [segment["text"].strip() for segment in result.get("segments", [])]
+
+            raw_text = " ".join(t for t in self._committed_texts + tail_texts if t).strip()
+            corrected_text = self.asr._apply_dictionary(raw_text)
+
+            self.stats["tail_seconds"] = len(tail) / (self.sample_rate * 2)
+            self.stats["release_to_final"] = time.perf_counter() - release_time
+            record("stream.release_to_final", self.stats["release_to_final"])
+            first_partial = self.stats["time_to_first_partial"]
+            print(f"⏱️ Streaming: first partial "
+                  f"{'n/a' if first_partial is None else f'{first_partial:.2f}s'}, "
+                  f"release→final {self.stats['release_to_final']:.2f}s "
+                  f"({self.stats['committed_seconds']:.1f}s committed, "
+                  f"{self.stats['tail_seconds']:.1f}s tail)")
+
+            audio_data = bytes(self._buffer)
+            return corrected_text, (audio_data, raw_text, self.sample_rate) if self.asr.logger else None
+
+        except Exception as e:
+            print(f"❌ Streaming transcription error: {e}")
+            return "", None
+
+    def _run(self):
+        """Worker loop: collect chunks and re-decode every step of new audio"""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            self._buffer.extend(chunk)
+
+            # Catch up on anything queued while we were decoding
+            try:
+                while True:
+                    chunk = self._queue.get_nowait()
+                    if chunk is None:
+                        return
+                    self._buffer.extend(chunk)
+            except queue.Empty:
+                pass
+
+            if len(self._buffer) // 2 - self._decoded_samples >= self.step_samples:
+                try:
+                    self._decode_partial()
+                except Exception as e:
+                    print(f"⚠️ Partial decode failed: {e}")
+
+    def _decode_partial(self):
+        """Decode the uncommitted window and commit stable complete segments"""
+        total_samples = len(self._buffer) // 2
+        window = bytes(self._buffer[self._committed_samples * 2:])
+        window_samples = len(window) // 2
+        self._decoded_samples = total_samples
+
+        result = self.asr._recognize_result(self.asr._bytes_to_numpy(window), **self._prompt_options())
+        segments = result.get("segments", [])
+
+        self.stats["partial_decodes"] += 1
+        if self.stats["time_to_first_partial"] is None:
+            self.stats["time_to_first_partial"] = time.perf_counter() - self._start_time
+            record("stream.first_partial", self.stats["time_to_first_partial"])
+        self.partial_text = " ".join(
+            self._committed_texts + [segment["text"].strip() for segment in segments]).strip()
+
+        # Commit leading complete segments that agree with the previous pass;
+        # the last segment may still change as more audio arrives
+        complete = segments[:-1]
+        commit_count = 0
+        for previous, segment in zip(self._previous_segments, complete):
+            if _normalize(previous["text"]) != _normalize(segment["text"]):
+                break
+            commit_count += 1
+        if window_samples > self.max_window_samples:
+            commit_count = len(complete)
+
+        if commit_count:
+            committed_end = min(int(segments[commit_count - 1]["end"] * self.sample_rate), window_samples)
+            self._committed_texts.extend(segment["text"].strip() for segment in segments[:commit_count])
+            self._committed_samples += committed_end
+            self.stats["committed_seconds"] = self._committed_samples / self.sample_rate
+            # Remaining segments are re-decoded from the new offset next pass
+            self._previous_segments = []
+        else:
+            self._previous_segments = segments
+
+    def _prompt_options(self):
+        """Condition the next window on the text committed so far"""
+        if not self._committed_texts:
+            return {}
+        return {"initial_prompt": " ".join(self._committed_texts)}
+
+
+def _normalize(text):
+    """Normalize segment text for agreement checks"""
+    return " ".join(text.lower().split())
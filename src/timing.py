@@ -0,0 +1,131 @@
+"""
+Lightweight span timing for the dictation stages
+
+    from timing import span
+    with span("asr.decode", audio_seconds=2.4):
+        ...
+
+Every span lands in a rolling per-stage window (the last `window` durations)
+summarized as p50/p95/p99. Set HEVE_SPAN_LOG to a file path to also append
+one JSON line per span; `python src/data_manager.py stats` summarizes that
+file (or a running daemon's in-memory histograms with --daemon).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+PERCENTILES = (50, 95, 99)
+
+
+class Tracer:
+    def __init__(self, window=1000, log_path=None):
+        """
+        window: spans kept per stage for the rolling percentiles
+        log_path: optional JSONL file each span is appended to
+        """
+        self.window = window
+        self.log_path = Path(log_path) if log_path else None
+        self._durations = {}  # stage -> deque of recent durations in seconds
+        self._counts = {}  # stage -> spans recorded since start
+        self._lock = threading.Lock()
+        self._log_file = None
+    
+    @classmethod
+    def from_env(cls):
+        """Build a tracer from HEVE_SPAN_LOG / HEVE_SPAN_WINDOW"""
+        return cls(
+            window=int(os.environ.get("HEVE_SPAN_WINDOW", "1000")),
+            log_path=os.environ.get("HEVE_SPAN_LOG") or None
+        )
+    
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block; the yielded dict can take extra attributes for the log"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - start, **attrs)
+    
+    def record(self, name, seconds, **attrs):
+        """Record a duration measured elsewhere"""
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=self.window)
+            durations.append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+            
+            if self.log_path:
+                try:
+                    if self._log_file is None:
+                        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                        self._log_file = open(self.log_path, 'a', encoding='utf-8')
+                    self._log_file.write(json.dumps(
+                        {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3), **attrs}) + "\n")
+                    self._log_file.flush()
+                except (OSError, TypeError) as e:
+                    print(f"⚠️ Span log disabled: {e}")
+                    self.log_path = None
+    
+    def summary(self) -> dict:
+        """{stage: {count, window, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            snapshot = {name: (list(durations), self._counts[name]) for name, durations in self._durations.items()}
+        return {name: {"count": count, **summarize(durations)} for name, (durations, count) in sorted(snapshot.items())}
+    
+    def reset(self):
+        """Forget all recorded spans"""
+        with self._lock:
+            self._durations.clear()
+            self._counts.clear()
+
+
+def summarize(durations) -> dict:
+    """Nearest-rank percentiles of durations (seconds) in milliseconds"""
+    ordered = sorted(durations)
+    if not ordered:
+        return {"window": 0}
+    summary = {"window": len(ordered), "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3)}
+    for percentile in PERCENTILES:
+        rank = max(1, -(-percentile * len(ordered) // 100))  # ceil without floats
+        summary[f"p{percentile}_ms"] = round(ordered[rank - 1] * 1000, 3)
+    summary["max_ms"] = round(ordered[-1] * 1000, 3)
+    return summary
+
+
+def load_span_log(path, window=1000, since=None) -> Tracer:
+    """Replay a JSONL span log into a Tracer (spans older than the `since` timestamp are skipped)"""
+    tracer = Tracer(window=window)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line
+            if since is not None and entry.get("ts", 0) < since:
+                continue
+            tracer.record(entry["span"], entry["ms"] / 1000)
+    return tracer
+
+
+def format_summary(summary) -> str:
+    """Fixed-width table of a Tracer.summary()"""
+    lines = [f"{'stage':<28} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for name, stats in summary.items():
+        if not stats.get("window"):
+            continue
+        lines.append(f"{name:<28} {stats['count']:>7} " + " ".join(
+            f"{stats[key]:>7.1f}ms" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")))
+    return "\n".join(lines)
+
+
+# Process-wide tracer used by every stage
+tracer = Tracer.from_env()
+span = tracer.span
+record = tracer.record
@@ -0,0 +1,93 @@
+"""
+Voice activity detection - trims leading/trailing silence before Whisper
+"""
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000, frame_ms=30, energy_threshold_db=-45.0,
+                 noise_margin_db=10.0, zcr_threshold=0.25, zcr_energy_margin_db=10.0,
+                 hangover_ms=240, pad_ms=120, min_speech_ms=90):
+        """
+        Frame-level energy + zero-crossing VAD.
+
+        A frame is speech when its RMS level is above both `energy_threshold_db`
+        (dBFS) and the clip's noise floor + `noise_margin_db`, or when it is within
+        `zcr_energy_margin_db` of that threshold and has a zero-crossing rate above
+        `zcr_threshold` (quiet fricatives like "s" and "f"). Speech is extended by
+        `hangover_ms` after each speech frame and `pad_ms` before the first one.
+        Clips with less than `min_speech_ms` of speech count as silence.
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_threshold = zcr_threshold
+        self.zcr_energy_margin_db = zcr_energy_margin_db
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self.pad_samples = int(sample_rate * pad_ms / 1000)
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+
+        self.stats = {"clips": 0, "silent_clips": 0, "input_samples": 0, "trimmed_samples": 0}
+
+    def speech_mask(self, audio_np: np.ndarray) -> np.ndarray:
+        """Return a boolean speech flag per frame (hangover applied)"""
+        speech = self._frame_decisions(audio_np)
+
+        # Hangover: keep each speech decision alive for the following frames
+        if self.hangover_frames and speech.any():
+            kernel = np.ones(self.hangover_frames + 1, dtype=np.int32)
+            speech = np.convolve(speech.astype(np.int32), kernel)[:len(speech)] > 0
+
+        return speech
+
+    def _frame_decisions(self, audio_np: np.ndarray) -> np.ndarray:
+        """Raw per-frame speech decisions (no hangover)"""
+        n_frames = len(audio_np) // self.frame_length
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = audio_np[:n_frames * self.frame_length].reshape(n_frames, self.frame_length)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        level_db = 20.0 * np.log10(rms + 1e-10)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_length - 1)
+
+        noise_floor_db = np.percentile(level_db, 10)
+        threshold_db = max(self.energy_threshold_db, noise_floor_db + self.noise_margin_db)
+        return (level_db > threshold_db) | (
+            (level_db > threshold_db - self.zcr_energy_margin_db) & (zcr > self.zcr_threshold)
+        )
+
+    def trim(self, audio_np: np.ndarray):
+        """
+        Trim leading/trailing silence.
+        Returns (trimmed_audio, info); info["speech"] is False for silence-only clips.
+        """
+        total = len(audio_np)
+        raw_speech = self._frame_decisions(audio_np)
+        self.stats["clips"] += 1
+        self.stats["input_samples"] += total
+
+        # Count speech before hangover so a click plus hangover is not "speech"
+        speech_frames = np.flatnonzero(raw_speech)
+        if len(speech_frames) < self.min_speech_frames:
+            self.stats["silent_clips"] += 1
+            self.stats["trimmed_samples"] += total
+            return audio_np[:0], {"speech": False, "start": 0, "end": 0, "trimmed_samples": total}
+
+        start = max(0, speech_frames[0] * self.frame_length - self.pad_samples)
+        end_frame = speech_frames[-1] + 1 + self.hangover_frames
+        # Keep the partial frame at the end when speech runs up to it
+        end = total if end_frame >= len(raw_speech) else end_frame * self.frame_length
+
+        trimmed_samples = int(total - (end - start))
+        self.stats["trimmed_samples"] += trimmed_samples
+        return audio_np[start:end], {
+            "speech": True,
+            "start": int(start),
+            "end": int(end),
+            "trimmed_samples": trimmed_samples,
+        }
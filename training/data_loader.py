@@ -3,11 +3,17 @@ Data loader that integrates dictionary corrections with fine-tuning pipeline
 """
 import pandas as pd
 import json
+import sqlite3
+import sys
 from pathlib import Path
 from typing import List, Dict, Tuple
-import librosa
 import numpy as np
 
+# Add the src directory to the path for the shared audio archive
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from audio_archive import AudioArchive
+from feature_cache import FeatureCache, audio_hash
+
 class DataLoader:
     def __init__(self, data_dir="training/data", dict_file="training/vocabulary_dictionary.json"):
         self.data_dir = Path(data_dir)
@@ -15,7 +21,25 @@ class DataLoader:
         self.audio_dir = self.data_dir / "audio"
         self.snippets_dir = self.data_dir / "audio_snippets"
         self.csv_file = self.data_dir / "transcriptions.csv"
+        self.db_file = self.data_dir / "transcriptions.db"
+        self.archive_dir = self.data_dir / "audio_archive"
+        self.feature_cache_dir = self.data_dir / "feature_cache"
+        self._archive = None
         
+    def read_transcriptions(self) -> pd.DataFrame:
+        """Load transcriptions from DataLogger's database, or the CSV export if there is none"""
+        if self.db_file.exists():
+            connection = sqlite3.connect(str(self.db_file))
+            try:
+                return pd.read_sql_query(
+                    "SELECT timestamp, audio_file, transcription, corrected_transcription, audio_duration "
+                    "FROM transcriptions ORDER BY id",
+                    connection
+                )
+            finally:
+                connection.close()
+        return pd.read_csv(self.csv_file)
+    
     def load_dictionary(self) -> Dict:
         """Load vocabulary dictionary"""
         if self.dict_file.exists():
@@ -28,9 +52,11 @@ class DataLoader:
         Create dual training dataset that includes:
         1. CSV transcriptions (corrected)
         2. Dictionary audio snippets
+        Audio entries are WAV paths, or {"array", "sampling_rate"} for utterances
+        that only exist in the audio archive (both work as a datasets Audio column).
         """
         # Load main transcriptions
-        df = pd.read_csv(self.csv_file)
+        df = self.read_transcriptions()
         corrected_df = df[df['corrected_transcription'].notna() & (df['corrected_transcription'] != '')]
         
         audio_paths = []
@@ -38,9 +64,9 @@ class DataLoader:
         
         # Add main corrected examples
         for _, row in corrected_df.iterrows():
-            audio_path = self.audio_dir / row['audio_file']
-            if audio_path.exists():
-                audio_paths.append(str(audio_path))
+            audio = self.resolve_audio(row['audio_file'])
+            if audio is not None:
+                audio_paths.append(audio)
                 transcriptions.append(row['corrected_transcription'])
         
         # Add audio snippet examples for dictionary vocabulary training
@@ -51,6 +77,84 @@ class DataLoader:
         
         return audio_paths, transcriptions
     
+    def iter_training_examples(self):
+        """
+        Yield {"audio": {"array", "sampling_rate"}, "sentence"} for every corrected
+        transcription, in the format datasets.Dataset.from_generator expects.
+        Archived audio is read sequentially in shard order; utterances that were
+        never packed fall back to their WAV files.
+        """
+        for _, array, sample_rate, sentence in self._iter_corrected_audio():
+            yield {"audio": {"array": array, "sampling_rate": sample_rate}, "sentence": sentence}
+    
+    def build_feature_cache(self, feature_config=None, workers=None,
+                            remove_other_configs=False) -> Tuple[FeatureCache, List[Tuple[str, str]]]:
+        """
+        Compute log-mel features for every corrected transcription that is not
+        cached yet (see feature_cache.py). Returns the cache and the
+        (audio hash, sentence) pairs of the dataset, in iter_training_examples() order.
+        remove_other_configs deletes the caches built for other feature configs
+        """
+        cache = FeatureCache(self.feature_cache_dir, feature_config, workers)
+        if remove_other_configs:
+            print(f"🗑️ Removed {cache.remove_other_configs()} feature caches of other configs")
+        examples = []
+        
+        def keyed_audio():
+            for _, array, sample_rate, sentence in self._iter_corrected_audio():
+                key = audio_hash(array, sample_rate)
+                examples.append((key, sentence))
+                yield key, array, sample_rate
+        
+        stats = cache.build(keyed_audio())
+        print(f"✅ Feature cache: {stats['cached']} cached, {stats['computed']} computed, "
+              f"{stats['removed']} stale removed in {stats['seconds']:.1f}s")
+        return cache, examples
+    
+    def iter_cached_features(self, feature_config=None, workers=None):
+        """
+        Yield {"input_features", "sentence"} for every corrected transcription,
+        building the feature cache first. Features are memory-mapped from the cache
+        """
+        cache, examples = self.build_feature_cache(feature_config, workers)
+        for key, sentence in examples:
+            yield {"input_features": cache.get(key), "sentence": sentence}
+    
+    def resolve_audio(self, audio_file):
+        """
+        Audio of a logged utterance: its WAV path if the file exists, else
+        {"array", "sampling_rate"} read from the audio archive, else None
+        """
+        audio_path = self.audio_dir / audio_file
+        if audio_path.exists():
+            return str(audio_path)
+        if self._archive is None and self.archive_dir.exists():
+            self._archive = AudioArchive(self.archive_dir)
+        if self._archive is not None and audio_file in self._archive:
+            samples, sample_rate = self._archive.read(audio_file)
+            return {"array": samples.astype(np.float32) / 32768.0, "sampling_rate": sample_rate}
+        return None
+    
+    def _iter_corrected_audio(self):
+        """Yield (audio_file, float32 samples, sample_rate, sentence) for every corrected transcription"""
+        df = self.read_transcriptions()
+        corrected_df = df[df['corrected_transcription'].notna() & (df['corrected_transcription'] != '')]
+        sentences = dict(zip(corrected_df['audio_file'], corrected_df['corrected_transcription']))
+        
+        archived = set()
+        if self.archive_dir.exists():
+            for utterance_id, samples, sample_rate in AudioArchive(self.archive_dir).iter_utterances():
+                if utterance_id in sentences:
+                    archived.add(utterance_id)
+                    yield utterance_id, samples.astype(np.float32) / 32768.0, sample_rate, sentences[utterance_id]
+        
+        for audio_file, sentence in sentences.items():
+            audio_path = self.audio_dir / audio_file
+            if audio_file not in archived and audio_path.exists():
+                import librosa  # Only needed for utterances that were never packed
+                array, sample_rate = librosa.load(str(audio_path), sr=None)
+                yield audio_file, array, sample_rate, sentence
+    
     def _generate_dictionary_examples(self, df: pd.DataFrame, dictionary: Dict) -> List[Tuple[str, str]]:
         """
         Generate synthetic training examples by applying dictionary corrections
@@ -62,14 +166,15 @@ class DataLoader:
         for _, row in df.iterrows():
             original = row['transcription']
             corrected = row['corrected_transcription']
-            audio_path = str(self.audio_dir / row['audio_file'])
             
             # Create variations with different dictionary corrections
             for wrong, correct in replacements.items():
                 if wrong.lower() in original.lower() and correct in corrected:
                     # This audio contains a word that was dictionary-corrected
                     # Use this as a positive example for contextual learning
-                    examples.append((audio_path, corrected))
+                    audio = self.resolve_audio(row['audio_file'])
+                    if audio is not None:
+                        examples.append((audio, corrected))
                     break
         
         return examples
@@ -96,9 +201,9 @@ class DataLoader:
     def create_contextual_training_pairs(self) -> List[Tuple[str, str, str]]:
         """
         Create training pairs that teach contextual understanding:
-        (audio_path, wrong_context, correct_context)
+        (audio, wrong_context, correct_context), audio as in resolve_audio()
         """
-        df = pd.read_csv(self.csv_file)
+        df = self.read_transcriptions()
         dictionary = self.load_dictionary()
         context_mappings = dictionary.get("context_mappings", {})
         
@@ -107,7 +212,6 @@ class DataLoader:
         for _, row in df.iterrows():
             original = row['transcription']
             corrected = row['corrected_transcription']
-            audio_path = str(self.audio_dir / row['audio_file'])
             
             # Find context-dependent corrections
             for word, contexts in context_mappings.items():
@@ -118,7 +222,9 @@ class DataLoader:
                         # This is a context-dependent correction
                         wrong_context = original
                         correct_context = corrected
-                        pairs.append((audio_path, wrong_context, correct_context))
+                        audio = self.resolve_audio(row['audio_file'])
+                        if audio is not None:
+                            pairs.append((audio, wrong_context, correct_context))
         
         return pairs
     
@@ -129,7 +235,7 @@ class DataLoader:
         
         return {
             "total_examples": len(audio_paths),
-            "main_transcriptions": len(pd.read_csv(self.csv_file)),
+            "main_transcriptions": len(self.read_transcriptions()),
             "corrected_transcriptions": len([t for t in transcriptions if t]),
             "contextual_pairs": len(contextual_pairs),
             "snippet_examples": len(list(self.snippets_dir.glob("*.wav"))) if self.snippets_dir.exists() else 0
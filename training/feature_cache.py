@@ -0,0 +1,227 @@
+"""
+Precomputed log-mel features for fine-tuning
+
+Running Whisper's feature extractor is the slow part of preparing a training
+run, and every epoch and hyperparameter sweep used to repeat it. FeatureCache
+computes the spectrograms once on a process pool and stores them in sharded
+.npy files that are memory-mapped on read. Entries are keyed by a hash of the
+decoded audio, inside a directory named after a hash of the feature-extractor
+config: edited audio and config changes both miss the cache and are
+recomputed, and packing WAVs into the audio archive does not invalidate it.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import numpy as np
+
+# WhisperFeatureExtractor settings of whisper-tiny to large-v2 (large-v3 uses feature_size=128)
+DEFAULT_FEATURE_CONFIG = {
+    "feature_size": 80,
+    "sampling_rate": 16000,
+    "hop_length": 160,
+    "n_fft": 400,
+    "chunk_length": 30,
+}
+
+INDEX_NAME = "index.json"
+
+# Per-process state created by _init_worker
+_worker = {}
+
+
+def _init_worker(feature_config):
+    """One single-threaded feature extractor per worker process"""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = "1"
+    from transformers import WhisperFeatureExtractor
+    _worker["extractor"] = WhisperFeatureExtractor(**feature_config)
+
+
+def _extract(key, array, sampling_rate):
+    """Worker task: (key, float32 log-mel features of shape (feature_size, frames))"""
+    extractor = _worker["extractor"]
+    if sampling_rate != extractor.sampling_rate:
+        import librosa
+        array = librosa.resample(array, orig_sr=sampling_rate, target_sr=extractor.sampling_rate)
+    features = extractor(array, sampling_rate=extractor.sampling_rate, return_tensors="np").input_features[0]
+    return key, features.astype(np.float32)
+
+
+def audio_hash(array, sampling_rate) -> str:
+    """Cache key of a decoded clip (float32 samples in [-1, 1])"""
+    digest = hashlib.sha1(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+    digest.update(str(sampling_rate).encode())
+    return digest.hexdigest()
+
+
+def config_hash(feature_config) -> str:
+    """Name of the cache directory for a feature-extractor config"""
+    try:
+        from importlib.metadata import version
+        extractor_version = version("transformers")
+    except Exception:
+        extractor_version = None
+    key = json.dumps({"config": feature_config, "transformers": extractor_version}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class FeatureCache:
+    def __init__(self, cache_dir="training/data/feature_cache", feature_config=None, workers=None,
+                 shard_rows=128):
+        """
+        feature_config: WhisperFeatureExtractor arguments (defaults to DEFAULT_FEATURE_CONFIG)
+        workers: feature extraction processes (default: one per core, at most 8)
+        shard_rows: spectrograms per shard file (each ~1 MB with the default config)
+        """
+        self.feature_config = dict(DEFAULT_FEATURE_CONFIG, **(feature_config or {}))
+        self.root_dir = Path(cache_dir)
+        self.cache_dir = self.root_dir / config_hash(self.feature_config)
+        self.workers = workers or min(os.cpu_count() or 1, 8)
+        self.shard_rows = shard_rows
+
+        self.entries = {}  # audio hash -> (shard, row)
+        self._shards = {}  # shard number -> memory-mapped array
+        index_path = self.cache_dir / INDEX_NAME
+        if index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.entries = {key: tuple(entry) for key, entry in json.load(f)["entries"].items()}
+            # Entries of a deleted or truncated shard are recomputed on the next build
+            readable = {shard for shard in {shard for shard, _ in self.entries.values()} if self._open_shard(shard)}
+            self.entries = {key: entry for key, entry in self.entries.items() if entry[0] in readable}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Read-only memory-mapped features for key, or None if not cached"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        shard, row = entry
+        if shard not in self._shards:
+            self._shards[shard] = np.load(self._shard_path(shard), mmap_mode='r')
+        return self._shards[shard][row]
+
+    def _open_shard(self, shard) -> bool:
+        """Memory-map a shard; False if it is missing or truncated"""
+        try:
+            self._shards[shard] = np.load(self._shard_path(shard), mmap_mode='r')
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def build(self, examples) -> dict:
+        """
+        Make sure every (key, array, sampling_rate) example is cached.
+        Missing ones are computed on the worker pool; entries and shards of this
+        config no longer referenced by examples are removed (other configs' caches
+        are kept - see remove_other_configs()).
+        Returns {"cached", "computed", "removed", "seconds"}
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        start_time = time.perf_counter()
+        stats = {"cached": 0, "computed": 0, "removed": 0, "seconds": 0.0}
+        live = set()
+        pending = []  # (key, features) not yet written to a shard
+        pool = None
+        in_flight = set()
+
+        def collect(return_when):
+            nonlocal in_flight
+            finished, in_flight = wait(in_flight, return_when=return_when)
+            for future in finished:
+                pending.append(future.result())
+                stats["computed"] += 1
+            while len(pending) >= self.shard_rows:
+                self._write_shard(pending[:self.shard_rows])
+                del pending[:self.shard_rows]
+
+        try:
+            for key, array, sampling_rate in examples:
+                if key in live:
+                    continue
+                live.add(key)
+                if key in self.entries:
+                    stats["cached"] += 1
+                    continue
+
+                if pool is None:
+                    print(f"🧮 Computing log-mel features with {self.workers} workers")
+                    # spawn: workers must not inherit a forked copy of the parent's thread pools
+                    pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=_init_worker, initargs=(self.feature_config,))
+                in_flight.add(pool.submit(_extract, key, array, sampling_rate))
+                # Bound the decoded audio held in memory
+                if len(in_flight) >= self.workers * 4:
+                    collect(FIRST_COMPLETED)
+
+            collect(ALL_COMPLETED)
+            if pending:
+                self._write_shard(pending)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        stats["removed"] = self._prune(live)
+        stats["seconds"] = time.perf_counter() - start_time
+        return stats
+
+    def _write_shard(self, items):
+        """Write computed features as a new shard, then index it"""
+        shard = max((shard for shard, _ in self.entries.values()), default=-1) + 1
+        path = self._shard_path(shard)
+        # Write under a temporary name so an interrupted build never leaves a truncated shard
+        temporary_path = path.with_name(path.name + ".tmp")
+        with open(temporary_path, 'wb') as f:
+            np.save(f, np.stack([features for _, features in items]))
+        os.replace(temporary_path, path)
+        for row, (key, _) in enumerate(items):
+            self.entries[key] = (shard, row)
+        self._write_index()
+
+    def remove_other_configs(self) -> int:
+        """Delete the caches of every other feature-extractor config; returns how many"""
+        removed = 0
+        if self.root_dir.exists():
+            for path in self.root_dir.iterdir():
+                if path.is_dir() and path != self.cache_dir:
+                    shutil.rmtree(path)
+                    removed += 1
+        return removed
+
+    def _prune(self, live) -> int:
+        """Drop entries not in live, delete unreferenced shards and leftovers of interrupted writes"""
+        removed = [key for key in self.entries if key not in live]
+        for key in removed:
+            del self.entries[key]
+        if removed:
+            self._write_index()
+
+        referenced = {shard for shard, _ in self.entries.values()}
+        for path in self.cache_dir.glob("shard_*.npy"):
+            shard = int(path.name.split('.')[0].split('_')[1])
+            if shard not in referenced:
+                self._shards.pop(shard, None)
+                path.unlink()
+        for path in self.cache_dir.glob("*.tmp"):
+            path.unlink()
+        return len(removed)
+
+    def _write_index(self):
+        temporary_path = self.cache_dir / (INDEX_NAME + ".tmp")
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({"config": self.feature_config, "entries": self.entries}, f)
+        os.replace(temporary_path, self.cache_dir / INDEX_NAME)
+
+    def _shard_path(self, shard):
+        return self.cache_dir / f"shard_{shard:05d}.npy"